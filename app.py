@@ -1,24 +1,69 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-from datetime import date, timedelta
 from src.bootstrap import rolling_bootstrap_ci
-from src.visualization import animated_ci_band
+from src.visualization import (
+    animated_ci_band,
+    return_distribution_chart,
+    rolling_diagnostics_chart,
+    rolling_sharpe_chart
+)
 from src.data_fetch import fetch_prices
 
 from src.analysis import (
     compute_returns,
+    moment_summary,
+    portfolio_moment_metrics,
     portfolio_returns,
-    rolling_sharpe,
-    regime_conditioned_sharpe
+    rolling_sharpe_surface,
+    regime_conditioned_sharpe,
+    rolling_sharpe
 )
-from src.bootstrap import bootstrap_ci
-from src.distributions import fit_return_distribution
+from src.bootstrap import adaptive_bootstrap_ci
+from src.cache import RESULT_CACHE
+from src.distributions import fit_return_distribution, rolling_moment_diagnostics
+from src.instrumentation import Profiler, set_profiler, stage
+from src.pipeline import Pipeline
+from src.precompute import default_precompute_store, default_range, sharpe_from_stats
+from src.universe import AVAILABLE_TICKERS, open_panel
 
 st.set_page_config(layout="wide", page_title="Probabilistic Equity Valuation")
 
 st.title("📈 Probabilistic Equity Valuation Dashboard")
 
+# Worker processes for bootstrap work (1 = run in the Streamlit process)
+N_JOBS = int(os.environ.get("DASHBOARD_N_JOBS", "1"))
+
+
+@st.cache_resource
+def get_executor(n_jobs):
+    # One long-lived pool per server instead of one per rerun
+    return ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+
+
+executor = get_executor(N_JOBS)
+
+
+@st.cache_resource
+def get_precompute_store():
+    # Shared so loaded entries stay in memory across reruns and sessions
+    return default_precompute_store()
+
+
+precompute_store = get_precompute_store()
+
+# Fixed bootstrap seed: identical inputs give identical CIs, so pipeline
+# stages can be served from the content-addressed cache across reruns/sessions
+BOOT_SEED = 12345
+
+# Rolling window slider range; the Sharpe surface covers every value
+WINDOW_MIN, WINDOW_MAX = 30, 252
+
+
 
 
 
@@ -29,36 +74,9 @@ st.title("📈 Probabilistic Equity Valuation Dashboard")
 with st.sidebar:
     st.header("Portfolio Builder")
     
-    # Automatically get the list
-    available_tickers = sorted([
-        # --- BIG TECH (Magnificent 7 & Semi) ---
-        "AAPL", "MSFT", "GOOGL", "AMZN", "META", "NVDA", "TSLA", "AVGO", "AMD", "INTC", "QCOM", "ADBE", "CRM", "NFLX",
-        
-        # --- FINANCE & PAYMENTS ---
-        "JPM", "BAC", "WFC", "GS", "MS", "V", "MA", "PYPL", "AXP", "BLK", "BRK-B",
-        
-        # --- HEALTHCARE & BIO ---
-        "LLY", "UNH", "JNJ", "PFE", "ABBV", "MRK", "AMGN", "ISRG", "TMO",
-        
-        # --- CONSUMER & RETAIL ---
-        "WMT", "COST", "PG", "KO", "PEP", "NKE", "SBUX", "MCD", "DIS", "HD", "LOW",
-        
-        # --- ENERGY & INDUSTRIALS ---
-        "XOM", "CVX", "CAT", "BA", "GE", "UNP", "HON", "RTX",
-        
-        # --- REAL ESTATE / REITS (Useful for your metro project) ---
-        "PLD", "AMT", "EQIX", "O", "WELL", "PSA", "SPG", "VICI", "DLR",
-        
-        # --- ETFS & INDICES ---
-        "SPY", "QQQ", "VOO", "IVV", "IWM", "DIA", "VTI", "VUG", "SCHD", "ARKK", "TLT", "GLD",
-        
-        # --- CRYPTO (Yahoo Finance Format) ---
-        "BTC-USD", "ETH-USD", "SOL-USD"
-    ])
-
     selected = st.multiselect(
         "Select assets from S&P 500",
-        options=available_tickers,
+        options=AVAILABLE_TICKERS,
         default=["AAPL", "MSFT"]
     )
 
@@ -72,11 +90,9 @@ with st.sidebar:
             step=1.0
         )
 
-    start_date = st.date_input(
-        "Start date",
-        date.today() - timedelta(days=365 * 3)
-    )
-    end_date = st.date_input("End date", date.today())
+    default_start, default_end = default_range()
+    start_date = st.date_input("Start date", default_start)
+    end_date = st.date_input("End date", default_end)
 
     rf_rate = st.number_input(
         "Risk-free rate (annual)",
@@ -86,9 +102,28 @@ with st.sidebar:
 
     window = st.slider(
         "Rolling Sharpe window (days)",
-        30, 252, 126
+        WINDOW_MIN, WINDOW_MAX, 126
+    )
+
+    profile_run = st.checkbox(
+        "Profile this run (debug)",
+        value=False,
+        help="Record per-stage timings and memory; adds a debug panel at the bottom."
     )
 
+# Each session profiles into its own profiler, so concurrent sessions do
+# not reset or switch off each other's (or the DASHBOARD_PROFILE global)
+if "profiler" not in st.session_state:
+    st.session_state.profiler = Profiler()
+profiler = st.session_state.profiler
+if profile_run:
+    profiler.reset()
+    profiler.enable()
+    set_profiler(profiler)
+else:
+    profiler.disable()
+    set_profiler(None)
+
 # --------------------------------------------------
 # Validate portfolio
 # --------------------------------------------------
@@ -123,7 +158,15 @@ def load_prices(tickers, start, end):
 
 
 
-prices, valid_tickers = load_prices(weights.index.tolist(), start_date, end_date)
+with stage("app.load_prices"):
+    # Zero-copy slice of the shared panel when it covers the request
+    panel = open_panel()
+    if panel is not None and panel.covers(weights.index, start_date, end_date):
+        prices = panel.prices(weights.index.tolist(), start_date, end_date)
+        valid_tickers = prices.columns.tolist()
+    else:
+        panel = None
+        prices, valid_tickers = load_prices(weights.index.tolist(), start_date, end_date)
 
 if prices is None or not isinstance(prices, pd.DataFrame):
     st.warning(
@@ -148,80 +191,179 @@ weights = weights.loc[valid_tickers]
 #    st.error("No valid price data available.")
 #    st.stop()
 
-returns = compute_returns(prices)
-
-# 🔒 GUARANTEED ALIGNMENT
-common_assets = sorted(set(returns.columns) & set(weights.index))
+# Every column of prices becomes a returns column
+common_assets = sorted(set(prices.columns) & set(weights.index))
 
 if not common_assets:
     st.error(
         f"No overlapping assets.\n\n"
-        f"Returns columns: {list(returns.columns)}\n"
+        f"Price columns: {list(prices.columns)}\n"
         f"Weights index: {list(weights.index)}"
     )
     st.stop()
 
-returns = returns[common_assets]
 weights = weights.loc[common_assets]
 weights = weights / weights.sum()
 
-port_ret = portfolio_returns(returns, weights)
-
+# Single-asset views on the default range are served from the nightly
+# precompute store when it was built from exactly these prices
+precomputed = None
+if len(weights) == 1:
+    precomputed = precompute_store.lookup(
+        weights.index[0], start_date, end_date, prices, seed=BOOT_SEED
+    )
 
 # --------------------------------------------------
-# Visualizations
-# --------------------------------------------------
-# --------------------------------------------------
-# 3. RUN THE CALCULATIONS (Add this block!)
+# Pipeline stages
 # --------------------------------------------------
+# Each stage declares its inputs; a widget change reruns only the stages
+# downstream of it (e.g. rf_rate never touches the bootstrap CIs) and the
+# rest are served from RESULT_CACHE.
+pipeline = Pipeline()
 
-# 1. Calculate Rolling Sharpe (This creates the 'rolling_sh' variable)
-rolling_sh = rolling_sharpe(port_ret, rf_rate, window)
 
-# 2. Calculate Regime-Conditioned Sharpe
-regime_sh = regime_conditioned_sharpe(port_ret, rf_rate)
+# With the shared panel, returns are views of its mapped returns instead
+# of a private compute_returns copy per session
+@pipeline.stage("returns", inputs=("prices", "weights", "panel", "period"))
+def returns_stage(prices, weights, panel, period):
+    if panel is not None:
+        return panel.returns(list(weights.index), *period)
+    return compute_returns(prices)[list(weights.index)]
 
-# 3. Fit the Distribution (for the JSON stats)
-dist_stats = fit_return_distribution(port_ret)
 
-# 4. Calculate Rolling Bootstrap Confidence Intervals
-ci_df = rolling_bootstrap_ci(port_ret, window=window, n_boot=800)
+# Keyed on prices alone, so quantity changes reuse the universe's moments
+@pipeline.stage("moments", inputs=("prices", "panel", "period"))
+def moments_stage(prices, panel, period):
+    if panel is not None:
+        return moment_summary(panel.returns(list(prices.columns), *period))
+    return moment_summary(compute_returns(prices))
 
-# 5. Extract latest CI values for the metric cards (col2)
-ci_low = ci_df['lower'].iloc[-1]
-ci_high = ci_df['upper'].iloc[-1]
 
+@pipeline.stage("summary", inputs=("moments", "weights"), cache=False)
+def summary_stage(moments, weights):
+    return portfolio_moment_metrics(moments, weights)
 
-alloc_fig = go.Figure(
-    go.Pie(
-        labels=weights.index,
-        values=weights.values,
-        hole=0.45
-    )
+
+@pipeline.stage("port_ret", inputs=("returns", "weights"))
+def port_ret_stage(returns, weights):
+    return portfolio_returns(returns, weights)
+
+
+@pipeline.stage("sharpe_surface", inputs=("port_ret", "rf_rate", "precomputed"))
+def sharpe_surface_stage(port_ret, rf_rate, precomputed):
+    if precomputed is not None:
+        return None
+    # Every slider window at once, so moving the slider is a column lookup
+    return rolling_sharpe_surface(port_ret, rf_rate, range(WINDOW_MIN, WINDOW_MAX + 1))
+
+
+@pipeline.stage(
+    "rolling_sh",
+    inputs=("sharpe_surface", "port_ret", "rf_rate", "window", "precomputed"),
+    cache=False,
 )
-alloc_fig.update_layout(title="Portfolio Allocation")
-
-sharpe_fig = go.Figure()
-sharpe_fig.add_trace(go.Scatter(
-    x=rolling_sh.index,
-    y=rolling_sh.values,
-    mode="lines",
-    name="Rolling Sharpe"
-))
-sharpe_fig.update_layout(title="Rolling Portfolio Sharpe")
-# --------------------------------------------------
-# Rolling Bootstrap CI (NOW port_ret EXISTS)
-# --------------------------------------------------
-ci_df = rolling_bootstrap_ci(
-    port_ret,
+def rolling_sharpe_stage(sharpe_surface, port_ret, rf_rate, window, precomputed):
+    if sharpe_surface is not None:
+        return sharpe_surface[window]
+    stats = precompute_store.load(precomputed)["rolling_stats"].get(window)
+    if stats is None:
+        return rolling_sharpe(port_ret, rf_rate, window)
+    return sharpe_from_stats(stats, rf_rate)
+
+
+@pipeline.stage("regime_sh", inputs=("port_ret", "rf_rate", "precomputed"))
+def regime_stage(port_ret, rf_rate, precomputed):
+    if precomputed is not None:
+        return sharpe_from_stats(precompute_store.load(precomputed)["regime"], rf_rate)
+    return regime_conditioned_sharpe(port_ret, rf_rate)
+
+
+@pipeline.stage("dist_stats", inputs=("port_ret", "precomputed"))
+def distribution_stage(port_ret, precomputed):
+    if precomputed is not None:
+        return precompute_store.load(precomputed)["distribution"]
+    return fit_return_distribution(port_ret)
+
+
+@pipeline.stage("ci_df", inputs=("port_ret", "window", "boot_seed", "precomputed"))
+def bootstrap_stage(port_ret, window, boot_seed, precomputed):
+    if precomputed is not None:
+        stored = precompute_store.load(precomputed)["rolling_ci"].get(window)
+        if stored is not None:
+            return stored
+    return rolling_bootstrap_ci(
+        port_ret, window=window, n_boot=800, seed=boot_seed, executor=executor
+    )
+
+
+@pipeline.stage("sharpe_ci", inputs=("port_ret", "rf_rate", "boot_seed"))
+def sharpe_ci_stage(port_ret, rf_rate, boot_seed):
+    # Analytic (Lo/Mertens) SE for long samples, else bootstrap until the
+    # endpoints' Monte Carlo error is below 2% of the CI width
+    return adaptive_bootstrap_ci(
+        port_ret, "sharpe", alpha=0.05, tol=0.02, rf=rf_rate / 252,
+        seed=boot_seed, executor=executor
+    )
+
+
+@pipeline.stage("diag_df", inputs=("port_ret", "window"))
+def diagnostics_stage(port_ret, window):
+    return rolling_moment_diagnostics(port_ret, window=window).dropna()
+
+
+@pipeline.stage("alloc_fig", inputs=("weights",))
+def allocation_chart_stage(weights):
+    fig = go.Figure(go.Pie(labels=weights.index, values=weights.values, hole=0.45))
+    fig.update_layout(title="Portfolio Allocation")
+    return fig
+
+
+@pipeline.stage("sharpe_fig", inputs=("rolling_sh",))
+def sharpe_chart_stage(rolling_sh):
+    return rolling_sharpe_chart(rolling_sh)
+
+
+@pipeline.stage("ci_fig", inputs=("ci_df",))
+def ci_chart_stage(ci_df):
+    return animated_ci_band(ci_df)
+
+
+@pipeline.stage("dist_fig", inputs=("port_ret", "dist_stats"))
+def distribution_chart_stage(port_ret, dist_stats):
+    return return_distribution_chart(port_ret, dist_stats, nbins=60)
+
+
+@pipeline.stage("diag_fig", inputs=("diag_df",))
+def diagnostics_chart_stage(diag_df):
+    return rolling_diagnostics_chart(diag_df)
+
+
+results = pipeline.run(
+    prices=prices,
+    weights=weights,
+    panel=panel,
+    period=(start_date, end_date),
+    rf_rate=rf_rate,
     window=window,
-    n_boot=800
+    boot_seed=BOOT_SEED,
+    precomputed=precomputed,
 )
 
+port_ret = results["port_ret"]
+summary = results["summary"]
+regime_sh = results["regime_sh"]
+dist_stats = results["dist_stats"]
+ci_df = results["ci_df"]
+sharpe_ci = results["sharpe_ci"]
+
+# Latest CI values for the metric cards (col2)
+ci_low = ci_df['lower'].iloc[-1]
+ci_high = ci_df['upper'].iloc[-1]
+
 st.subheader("🎞 Rolling Return Uncertainty")
 
-ci_fig = animated_ci_band(ci_df)
-st.plotly_chart(ci_fig, use_container_width=True)
+with stage("app.render.ci_band"):
+    st.plotly_chart(results["ci_fig"], use_container_width=True)
 
 st.info(
     "The shaded region shows the 95% bootstrap confidence interval "
@@ -234,29 +376,42 @@ st.info(
 # --------------------------------------------------
 col1, col2 = st.columns([2, 1])
 
-with col1:
-    st.plotly_chart(alloc_fig, use_container_width=True)
-    st.plotly_chart(sharpe_fig, use_container_width=True)
+with col1, stage("app.render.sharpe"):
+    st.plotly_chart(results["alloc_fig"], use_container_width=True)
+    st.plotly_chart(results["sharpe_fig"], use_container_width=True)
 
 with col2:
     st.subheader("Portfolio Summary")
 
     st.metric(
         "Mean Daily Return",
-        f"{port_ret.mean():.3%}"
+        f"{summary['mean']:.3%}"
     )
     st.metric(
         "Annualized Volatility",
-        f"{port_ret.std() * (252 ** 0.5):.2%}"
+        f"{summary['vol']:.2%}"
     )
     st.metric(
         "Sharpe Ratio",
-        f"{(port_ret.mean() / port_ret.std()) * (252 ** 0.5):.2f}"
+        f"{summary['sharpe']:.2f}"
     )
 
     st.write("**95% Bootstrap CI (Mean Return)**")
     st.write(f"[{ci_low:.3%}, {ci_high:.3%}]")
 
+    st.write("**95% CI (Annualized Sharpe, excess of rf)**")
+    st.write(
+        f"[{sharpe_ci['lower'] * 252 ** 0.5:.2f}, "
+        f"{sharpe_ci['upper'] * 252 ** 0.5:.2f}]"
+    )
+    if sharpe_ci["path"] == "analytic":
+        st.caption("Asymptotic Lo/Mertens standard error (no resampling needed).")
+    else:
+        st.caption(
+            f"Bootstrap with {sharpe_ci['n_boot']:,} replicates"
+            + ("" if sharpe_ci["converged"] else " (replicate cap reached)")
+        )
+
     st.write("**Regime-Conditioned Sharpe**")
     st.dataframe(regime_sh)
 
@@ -273,58 +428,10 @@ with colB:
     st.metric("Normal μ", f'{dist_stats["normal"]["mu"]:.4%}')
     st.metric("Normal σ", f'{dist_stats["normal"]["sigma"]:.2%}')
     st.metric("JB p-value", f'{dist_stats["jarque_bera_p"]:.2e}')
-import numpy as np
-from scipy import stats
-
 st.write("**Empirical Return Distribution**")
 
-hist_x = port_ret.dropna()
-
-x_grid = np.linspace(
-    hist_x.quantile(0.001),
-    hist_x.quantile(0.999),
-    400
-)
-
-fig = go.Figure()
-
-# Histogram
-fig.add_trace(go.Histogram(
-    x=hist_x,
-    histnorm="probability density",
-    name="Empirical",
-    nbinsx=60,
-    opacity=0.6
-))
-
-# Normal fit
-mu = dist_stats["normal"]["mu"]
-sigma = dist_stats["normal"]["sigma"]
-fig.add_trace(go.Scatter(
-    x=x_grid,
-    y=stats.norm.pdf(x_grid, mu, sigma),
-    name="Normal Fit",
-    line=dict(dash="dash")
-))
-
-# Student-t fit
-df = dist_stats["student_t"]["df"]
-loc = dist_stats["student_t"]["loc"]
-scale = dist_stats["student_t"]["scale"]
-fig.add_trace(go.Scatter(
-    x=x_grid,
-    y=stats.t.pdf(x_grid, df, loc, scale),
-    name="Student-t Fit"
-))
-
-fig.update_layout(
-    title="Return Distribution: Empirical vs Fitted",
-    xaxis_title="Daily Return",
-    yaxis_title="Density",
-    bargap=0.02
-)
-
-st.plotly_chart(fig, use_container_width=True)
+with stage("app.render.distribution"):
+    st.plotly_chart(results["dist_fig"], use_container_width=True)
 if dist_stats["jarque_bera_p"] < 0.01:
     st.warning(
         "Returns strongly deviate from normality.\n\n"
@@ -333,7 +440,44 @@ if dist_stats["jarque_bera_p"] < 0.01:
         "• Student-t distribution provides a better fit"
     )
 
+st.subheader("📉 Rolling Tail Behaviour")
+
+with stage("app.render.tail_diagnostics"):
+    st.plotly_chart(results["diag_fig"], use_container_width=True)
+
 st.caption(
     "Probabilistic estimates only. Not investment advice."
 )
 
+with st.expander("Analytics cache"):
+    st.write("**Pipeline stages this run**")
+    st.dataframe(pd.DataFrame({
+        "status": pd.Series(pipeline.last_run),
+        "seconds": pd.Series(pipeline.last_timings),
+    }))
+    st.json(RESULT_CACHE.stats())
+    meta = precompute_store.meta(precomputed) if precomputed is not None else None
+    if meta is not None:
+        st.caption(
+            f"Single-asset analytics served from the precompute store "
+            f"(built {meta['computed_at']}, data through {meta['data_end']}, "
+            f"last checked {meta['checked_at']})."
+        )
+
+if profile_run:
+    with st.expander("⏱ Performance debug"):
+        st.caption(
+            "Wall time, call count and tracemalloc peak (MB above the live heap "
+            "at stage start) for each app stage (app.*) and analytics function. "
+            "Cached results show up as near-zero app stages."
+        )
+        st.dataframe(profiler.report())
+        profile_json = profiler.to_json(indent=2)
+        st.download_button(
+            "Download profile (JSON)",
+            profile_json,
+            file_name="dashboard_profile.json",
+            mime="application/json"
+        )
+    # One structured log line per profiled run
+    logging.getLogger("equity_dashboard.profile").info(profiler.to_json())
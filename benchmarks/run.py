@@ -0,0 +1,261 @@
+# benchmarks/run.py
+"""
+Offline benchmark suite for the analytics functions.
+
+    python -m benchmarks.run                      # time and compare to baseline
+    python -m benchmarks.run --save               # record a new baseline
+    python -m benchmarks.run --sizes small --only sharpe --threshold 0.5
+
+Every case runs on synthetic data from ``benchmarks.synthetic``, so no
+network access is needed. A case is timed ``--repeat`` times after one
+warm-up call (the minimum is compared; the median is recorded), then run
+once more under tracemalloc for its peak allocation. The run exits with
+status 1 if any case is slower or hungrier than the baseline by more than
+the threshold. Baselines are machine-specific: record one per machine.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import synthetic_prices, synthetic_returns
+from src.analysis import (
+    compute_log_trend,
+    compute_returns,
+    log_trend_distance,
+    portfolio_returns,
+    regime_conditioned_sharpe,
+    rolling_sharpe
+)
+from src.bootstrap import bootstrap_sharpe, rolling_bootstrap_ci
+from src.distributions import fit_return_distribution
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# (observations, assets) per size
+SIZES = {
+    "small": (500, 10),
+    "medium": (2520, 50),
+    "large": (7560, 200),
+}
+
+
+# -----------------------------------------------------------
+# 1. CASES
+# -----------------------------------------------------------
+def _case_inputs(size, seed=0):
+    n_obs, n_assets = SIZES[size]
+    prices = synthetic_prices(n_obs, n_assets, seed=seed)
+    returns = synthetic_returns(n_obs, 1, seed=seed + 1).iloc[:, 0]
+    weights = pd.Series(1.0 / n_assets, index=prices.columns)
+    return prices, returns, weights
+
+
+def build_cases(size):
+    """``{name: zero-argument callable}`` for one problem size."""
+    prices, returns, weights = _case_inputs(size)
+    panel = compute_returns(prices)
+    price = prices.iloc[:, 0]
+    return {
+        "compute_returns": lambda: compute_returns(prices),
+        "compute_returns_float32": lambda: compute_returns(prices, dtype=np.float32),
+        "portfolio_returns": lambda: portfolio_returns(panel, weights),
+        "compute_log_trend": lambda: compute_log_trend(price),
+        "log_trend_distance": lambda: log_trend_distance(prices),
+        "rolling_sharpe": lambda: rolling_sharpe(returns, 0.03, 126),
+        "regime_conditioned_sharpe": lambda: regime_conditioned_sharpe(returns, 0.03),
+        "bootstrap_sharpe": lambda: bootstrap_sharpe(returns, n_boot=2000, seed=0),
+        "bootstrap_sharpe_stationary": lambda: bootstrap_sharpe(
+            returns, n_boot=2000, seed=0, method="stationary", block_length=5
+        ),
+        "rolling_bootstrap_ci": lambda: rolling_bootstrap_ci(
+            returns, window=126, n_boot=1000, seed=0
+        ),
+        "rolling_bootstrap_ci_stationary": lambda: rolling_bootstrap_ci(
+            returns, window=126, n_boot=1000, seed=0, method="stationary", block_length=5
+        ),
+        "rolling_bootstrap_ci_stationary_auto": lambda: rolling_bootstrap_ci(
+            returns, window=126, n_boot=1000, seed=0, method="stationary"
+        ),
+        "rolling_bootstrap_ci_moving_block": lambda: rolling_bootstrap_ci(
+            returns, window=126, n_boot=1000, seed=0, method="moving_block", block_length=5
+        ),
+        "rolling_bootstrap_ci_poisson": lambda: rolling_bootstrap_ci(
+            returns, window=126, n_boot=1000, mode="poisson", seed=0
+        ),
+        "rolling_bootstrap_ci_float32": lambda: rolling_bootstrap_ci(
+            returns, window=126, n_boot=1000, seed=0, dtype=np.float32
+        ),
+        "rolling_bootstrap_ci_poisson_float32": lambda: rolling_bootstrap_ci(
+            returns, window=126, n_boot=1000, mode="poisson", seed=0, dtype=np.float32
+        ),
+        "fit_return_distribution": lambda: fit_return_distribution(returns),
+    }
+
+
+# -----------------------------------------------------------
+# 2. MEASUREMENT
+# -----------------------------------------------------------
+def measure(func, repeat=5) -> dict:
+    """Wall time (min and median over ``repeat`` runs) and tracemalloc peak."""
+    func()  # warm-up: imports, caches, first-touch allocations
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "seconds": min(times),
+        "median_seconds": float(np.median(times)),
+        "peak_mb": peak / 1024 ** 2,
+    }
+
+
+def run_suite(sizes=("small", "medium"), only=None, repeat=5, stream=sys.stderr) -> dict:
+    """Benchmark every case at every size; keys are ``"<case>@<size>"``."""
+    results = {}
+    for size in sizes:
+        for name, func in build_cases(size).items():
+            if only and not any(pattern in name for pattern in only):
+                continue
+            key = f"{name}@{size}"
+            results[key] = measure(func, repeat=repeat)
+            r = results[key]
+            print(
+                f"{key:<40} {r['seconds'] * 1e3:10.2f} ms {r['peak_mb']:9.2f} MB",
+                file=stream,
+            )
+    return results
+
+
+# -----------------------------------------------------------
+# 3. BASELINES & REGRESSION CHECK
+# -----------------------------------------------------------
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def save_baseline(results, path=DEFAULT_BASELINE):
+    """Merge ``results`` into the baseline file, keeping unmeasured cases."""
+    baseline = load_baseline(path) or {"results": {}}
+    baseline["results"].update(results)
+    baseline["environment"] = environment()
+    baseline["recorded"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    with open(path, "w") as fh:
+        json.dump(baseline, fh, indent=2, sort_keys=True)
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return None
+
+
+def compare(results, baseline, threshold=0.5, mem_threshold=0.25,
+            min_seconds=0.002, min_mb=1.0) -> list:
+    """
+    Cases that regressed against ``baseline``.
+
+    A case regresses when it is more than ``threshold`` (a fraction) slower
+    than its baseline and also at least ``min_seconds`` slower in absolute
+    terms, so timer noise on sub-millisecond cases is ignored; peak memory
+    is checked the same way with ``mem_threshold`` and ``min_mb``.
+
+    Returns
+    -------
+    list of dict with case, metric, baseline, current and ratio
+    """
+    regressions = []
+    checks = (
+        ("seconds", threshold, min_seconds),
+        ("peak_mb", mem_threshold, min_mb),
+    )
+    for key, current in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        for metric, limit, slack in checks:
+            old, new = base[metric], current[metric]
+            if new > old * (1.0 + limit) and new - old > slack:
+                regressions.append({
+                    "case": key,
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "ratio": new / old if old else float("inf"),
+                })
+    return regressions
+
+
+# -----------------------------------------------------------
+# 4. CLI
+# -----------------------------------------------------------
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the analytics functions offline.")
+    parser.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    parser.add_argument("--only", nargs="+", help="run cases whose name contains any of these")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON path")
+    parser.add_argument("--save", action="store_true", help="record results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="allowed fractional slowdown (0.5 = 50%%)")
+    parser.add_argument("--mem-threshold", type=float, default=0.25,
+                        help="allowed fractional growth of peak memory")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.only, args.repeat)
+
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump({"environment": environment(), "results": results}, fh, indent=2)
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save first.", file=sys.stderr)
+        return 0
+
+    regressions = compare(results, baseline, args.threshold, args.mem_threshold)
+    for r in regressions:
+        unit = "s" if r["metric"] == "seconds" else " MB"
+        print(
+            f"REGRESSION {r['case']} {r['metric']}: {r['baseline']:.4g}{unit} -> "
+            f"{r['current']:.4g}{unit} ({r['ratio']:.2f}x)",
+            file=sys.stderr,
+        )
+    if not regressions:
+        print("No regressions.", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
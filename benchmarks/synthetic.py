@@ -0,0 +1,56 @@
+# benchmarks/synthetic.py
+import numpy as np
+import pandas as pd
+
+
+def synthetic_returns(
+    n_obs, n_assets=1, df=4.0, phi=0.05, vol=0.015, drift=0.0003, seed=0
+) -> pd.DataFrame:
+    """
+    Reproducible daily log-return panel with fat tails and autocorrelation.
+
+    Each column is an AR(1) process ``r_t = drift + phi * (r_{t-1} - drift) + e_t``
+    whose innovations are Student-t with ``df`` degrees of freedom, scaled
+    so the unconditional daily volatility is ``vol``. Columns share a
+    common factor so the panel is mildly correlated, like a stock universe.
+
+    Parameters
+    ----------
+    n_obs : int
+        Number of business days
+    n_assets : int
+        Number of columns (tickers ``S000``, ``S001``, ...)
+    df : float
+        Degrees of freedom of the innovations (> 2)
+    phi : float
+        Lag-1 autocorrelation
+    vol, drift : float
+        Daily volatility and mean
+    seed : int
+        Seed; the same arguments always give the same panel
+
+    Returns
+    -------
+    pd.DataFrame indexed by business day
+    """
+    rng = np.random.default_rng(seed)
+    t_scale = np.sqrt((df - 2.0) / df)
+    shocks = rng.standard_t(df, size=(n_obs, n_assets)) * t_scale
+    factor = rng.standard_t(df, size=(n_obs, 1)) * t_scale
+    innov = (0.6 * factor + 0.8 * shocks) * vol * np.sqrt(1.0 - phi ** 2)
+
+    out = np.empty((n_obs, n_assets))
+    prev = np.full(n_assets, drift)
+    for t in range(n_obs):
+        prev = drift + phi * (prev - drift) + innov[t]
+        out[t] = prev
+
+    index = pd.bdate_range("2000-01-03", periods=n_obs, name="Date")
+    columns = [f"S{i:03d}" for i in range(n_assets)]
+    return pd.DataFrame(out, index=index, columns=columns)
+
+
+def synthetic_prices(n_obs, n_assets=1, start_price=100.0, **kwargs) -> pd.DataFrame:
+    """Close prices whose log returns follow ``synthetic_returns``."""
+    returns = synthetic_returns(n_obs, n_assets, **kwargs)
+    return start_price * np.exp(returns.cumsum())
@@ -0,0 +1,2 @@
+# Lets pytest import the ``src`` and ``benchmarks`` namespace packages from
+# the repository root, as the app and the CLIs do.
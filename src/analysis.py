@@ -2,9 +2,14 @@
 import numpy as np
 import pandas as pd
 
+from src.bootstrap import iter_resample_counts, resample_counts
+from src.instrumentation import profiled
+from src.parallel import seed_sequence
+
 # -----------------------------------------------------------
 # 1. LOG TREND (log-price regression) 
 # -----------------------------------------------------------
+@profiled
 def compute_log_trend(series: pd.Series):
     """
     Fit log(price) ~ time to produce an exponential/trend line.
@@ -23,9 +28,115 @@ def compute_log_trend(series: pd.Series):
     return trend_series
 
 
+def _log_trend_fit(prices: pd.DataFrame, window, min_periods) -> np.ndarray:
+    """
+    Trailing log-linear trend of every column, evaluated at each row.
+
+    Least squares of log(price) on time over the last ``window`` rows
+    (all rows up to now if ``window`` is None, every row if ``"full"``)
+    from running sums of
+    1, t, t^2, y and t*y, so every (row, column) costs O(1). Missing
+    prices drop out of the sums. Time is centred on the sample midpoint
+    and log prices on their column mean to limit cancellation.
+    """
+    logp = np.log(prices.to_numpy(dtype=float))
+    mask = np.isfinite(logp)
+    n_rows = logp.shape[0]
+
+    with np.errstate(all="ignore"):
+        base = np.nanmean(np.where(mask, logp, np.nan), axis=0)
+    base = np.where(np.isfinite(base), base, 0.0)
+    y = np.where(mask, logp - base, 0.0)
+    m = mask.astype(float)
+    t = (np.arange(n_rows) - (n_rows - 1) / 2.0)[:, None]
+
+    terms = np.stack([m, m * t, m * t * t, y, t * y])
+    sums = np.zeros((5, n_rows + 1, logp.shape[1]))
+    np.cumsum(terms, axis=1, out=sums[:, 1:])
+
+    if window == "full":
+        stop = np.full(n_rows, n_rows)
+    else:
+        stop = np.arange(1, n_rows + 1)
+    start = np.zeros(n_rows, dtype=int) if window in (None, "full") else np.maximum(stop - window, 0)
+    n, sx, sxx, sy, sxy = sums[:, stop] - sums[:, start]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = n * sxx - sx * sx
+        slope = (n * sxy - sx * sy) / denom
+        intercept = (sy - slope * sx) / n
+        fitted = np.exp(intercept + slope * t + base)
+    return np.where((n >= max(min_periods, 2)) & (denom > 0), fitted, np.nan)
+
+
+def _trend_like(prices, values, name):
+    if isinstance(prices, pd.Series):
+        return pd.Series(values[:, 0], index=prices.index, name=name)
+    return pd.DataFrame(values, index=prices.index, columns=prices.columns)
+
+
+@profiled
+def rolling_log_trend(prices, window=252, min_periods=None):
+    """
+    Rolling log-linear trend without look-ahead.
+
+    Row ``t`` holds the exponential trend fitted to the ``window`` prices
+    ending at ``t`` and evaluated at ``t``, so distances from it use only
+    past data. Works column-wise on a whole prices DataFrame (or a Series)
+    in one vectorized pass; ``min_periods`` (default ``window``) prices
+    are required per fit.
+    """
+    frame = prices.to_frame() if isinstance(prices, pd.Series) else prices
+    min_periods = window if min_periods is None else min_periods
+    return _trend_like(prices, _log_trend_fit(frame, window, min_periods), "log_trend")
+
+
+@profiled
+def expanding_log_trend(prices, min_periods=2):
+    """
+    Expanding-window version of ``rolling_log_trend``: row ``t`` uses all
+    prices up to and including ``t``. The last row equals
+    ``compute_log_trend`` on the full (gap-free) series.
+    """
+    frame = prices.to_frame() if isinstance(prices, pd.Series) else prices
+    return _trend_like(prices, _log_trend_fit(frame, None, min_periods), "log_trend")
+
+
+@profiled
+def panel_log_trend(prices):
+    """
+    Full-sample log-linear trend of every column, like ``compute_log_trend``
+    but vectorized over a prices DataFrame (gaps are skipped, not dropped
+    from the index). Uses future data; see ``rolling_log_trend`` for a
+    trend without look-ahead.
+    """
+    frame = prices.to_frame() if isinstance(prices, pd.Series) else prices
+    return _trend_like(prices, _log_trend_fit(frame, "full", 2), "log_trend")
+
+
+@profiled
+def log_trend_distance(prices: pd.DataFrame, windows=(63, 126, 252), expanding=True) -> pd.DataFrame:
+    """
+    Percent distance of every ticker from its trailing log trends.
+
+    Returns
+    -------
+    pd.DataFrame with columns MultiIndex (trend, ticker), where trend is
+    each rolling window and, if requested, "expanding"
+    """
+    trends = {w: rolling_log_trend(prices, w) for w in windows}
+    if expanding:
+        trends["expanding"] = expanding_log_trend(prices)
+    return pd.concat(
+        {name: pct_distance(prices, trend) for name, trend in trends.items()},
+        axis=1, names=["trend", "ticker"],
+    )
+
+
 # -----------------------------------------------------------
 # 2. SMOOTH TREND (moving average)
 # -----------------------------------------------------------
+@profiled
 def compute_smooth_trend(series: pd.Series, window=50):
     """
     Returns a simple moving average to smooth volatility.
@@ -36,6 +147,7 @@ def compute_smooth_trend(series: pd.Series, window=50):
 # -----------------------------------------------------------
 # 3. % DISTANCE FROM TREND
 # -----------------------------------------------------------
+@profiled
 def pct_distance(series: pd.Series, trend: pd.Series):
     """
     Computes (price - trend) / trend as percent distance.
@@ -45,9 +157,20 @@ def pct_distance(series: pd.Series, trend: pd.Series):
 import numpy as np
 import pandas as pd
 
-def compute_returns(prices: pd.DataFrame) -> pd.DataFrame:
+@profiled
+def compute_returns(prices: pd.DataFrame, dtype=None) -> pd.DataFrame:
     """
     Compute daily returns with strict validation.
+
+    Each return runs from the ticker's previous valid close, as in the
+    shared panel, so a missing close costs that date only (its return is
+    NaN) rather than also the next one.
+
+    Returns are computed in float64 and then cast to ``dtype`` if given;
+    ``dtype=np.float32`` halves the memory of wide panels. Values then
+    carry a relative rounding error of at most 6e-8, and an annualized
+    rolling Sharpe computed from them stays within 1e-6 of the float64
+    one.
     """
     if prices is None:
         raise ValueError("Prices is None.")
@@ -57,16 +180,20 @@ def compute_returns(prices: pd.DataFrame) -> pd.DataFrame:
 
     prices = prices.sort_index()
 
-    returns = prices.pct_change().dropna(how="all")
+    returns = prices.ffill().pct_change().where(prices.notna()).dropna(how="all")
 
     if returns.empty:
         raise ValueError("Returns computation resulted in empty DataFrame.")
 
+    if dtype is not None:
+        returns = returns.astype(dtype)
+
     return returns
 
 
 import pandas as pd
 
+@profiled
 def portfolio_returns(returns: pd.DataFrame, weights: pd.Series) -> pd.Series:
     if returns is None or returns.empty:
         raise ValueError("Returns are empty.")
@@ -92,6 +219,7 @@ def portfolio_returns(returns: pd.DataFrame, weights: pd.Series) -> pd.Series:
 
 
 
+@profiled
 def rolling_sharpe(returns, rf_rate, window):
     daily_rf = rf_rate / 252
     excess = returns - daily_rf
@@ -101,9 +229,162 @@ def rolling_sharpe(returns, rf_rate, window):
         * np.sqrt(252)
     )
 
+
+@profiled
+def rolling_sharpe_surface(returns: pd.Series, rf_rate, windows) -> pd.DataFrame:
+    """
+    Rolling annualized Sharpe ratio for many windows in one O(n) pass.
+
+    Uses cumulative sums of excess returns and squared excess returns,
+    centered on the full-sample mean first so the window differences do
+    not cancel catastrophically. Column ``w`` matches
+    ``rolling_sharpe(returns, rf_rate, w)`` to about 1e-9 relative error
+    (the pandas path uses a different summation order). As in pandas, a
+    window containing NaNs yields NaN; zero-variance windows yield NaN.
+
+    Returns a DataFrame indexed like ``returns`` with one column per
+    window, so switching windows is a column lookup.
+    """
+    windows = np.asarray(sorted(set(int(w) for w in windows)))
+    if windows.size == 0 or windows.min() < 2:
+        raise ValueError("Windows must be integers >= 2.")
+
+    x = np.asarray(returns, dtype=float) - rf_rate / 252
+    valid = ~np.isnan(x)
+    center = x[valid].mean() if valid.any() else 0.0
+    y = np.where(valid, x - center, 0.0)
+
+    s1 = np.concatenate([[0.0], np.cumsum(y)])
+    s2 = np.concatenate([[0.0], np.cumsum(y * y)])
+    cnt = np.concatenate([[0], np.cumsum(valid)])
+
+    end = np.arange(1, len(x) + 1)[:, None]  # exclusive window ends
+    start = end - windows[None, :]
+    full = start >= 0
+    start = np.where(full, start, 0)
+
+    sum1 = s1[end] - s1[start]
+    sum2 = s2[end] - s2[start]
+    full &= (cnt[end] - cnt[start]) == windows
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = sum1 / windows
+        var = (sum2 - sum1 * mean) / (windows - 1)
+        sharpe = (mean + center) / np.sqrt(var) * np.sqrt(252)
+
+    tiny = np.finfo(float).eps * np.maximum(sum2, 1e-300)
+    sharpe[~full | (var <= tiny)] = np.nan
+
+    return pd.DataFrame(
+        sharpe, index=returns.index, columns=pd.Index(windows, name="window")
+    )
+
 import pandas as pd
 import numpy as np
 
+def _regime_labels(n_regimes):
+    if n_regimes == 3:
+        return ["Low Vol", "Mid Vol", "High Vol"]
+    return [f"Vol Q{i + 1}" for i in range(n_regimes)]
+
+
+@profiled
+def regime_sharpe_panel(
+    returns,
+    rf_rate: float = 0.0,
+    vol_window: int = 21,
+    n_regimes: int = 3,
+    n_boot: int = 0,
+    alpha: float = 0.05,
+    seed=None,
+    min_obs: int = 5,
+    moments: bool = False,
+) -> pd.DataFrame:
+    """
+    Volatility-regime Sharpe ratios for every asset in one vectorized pass.
+
+    Each asset's rolling volatility is split into ``n_regimes`` quantile
+    buckets (same edges and right-closed bins as ``pd.qcut``), and the
+    annualized Sharpe of the returns in each bucket is computed from
+    grouped sums: one one-hot tensor (dates x assets x regimes) and two
+    contractions, with no loop over assets or regimes.
+
+    With ``n_boot > 0``, percentile CIs are added from an i.i.d. bootstrap
+    over dates (regime labels travel with their returns). All assets and
+    regimes share one multiplicity matrix, so the replicates reduce to
+    three matmuls.
+
+    Returns
+    -------
+    DataFrame indexed by asset with column MultiIndex (field, regime);
+    fields are ``sharpe`` and ``n_obs``, plus ``lower``/``upper`` when
+    bootstrapping and the daily ``mean`` and ``std`` with ``moments=True``
+    (the Sharpe ratio for any other rate follows from those). Buckets with
+    fewer than ``min_obs`` returns or zero dispersion are NaN.
+    """
+    if isinstance(returns, pd.Series):
+        returns = returns.to_frame()
+
+    labels = _regime_labels(n_regimes)
+    X = returns.to_numpy(dtype=float)
+    V = returns.rolling(vol_window).std().to_numpy()
+    usable = ~np.isnan(V) & ~np.isnan(X)
+    n_assets = X.shape[1]
+
+    # Quantile edges per asset, then bucket = number of inner edges below
+    with np.errstate(invalid="ignore"):
+        inner = np.nanquantile(
+            np.where(usable, V, np.nan), np.linspace(0, 1, n_regimes + 1)[1:-1], axis=0
+        )
+        bucket = (V[:, :, None] > inner.T[None, :, :]).sum(axis=2)
+
+    onehot = (bucket[:, :, None] == np.arange(n_regimes)) & usable[:, :, None]
+    onehot = onehot.astype(float).reshape(len(X), n_assets * n_regimes)
+
+    # Center per asset so second moments do not cancel
+    center = np.nanmean(np.where(usable, X, np.nan), axis=0)
+    Y = np.where(usable, X - center, 0.0)
+    Yk = np.repeat(Y, n_regimes, axis=1) * onehot
+    center_k = np.repeat(center, n_regimes)
+    daily_rf = rf_rate / 252
+
+    def _sharpe(cnt, s1, s2):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = s1 / cnt
+            var = (s2 - s1 * mean) / (cnt - 1)
+            out = (mean + center_k - daily_rf) / np.sqrt(var) * np.sqrt(252)
+        return np.where((cnt >= min_obs) & (var > 0), out, np.nan)
+
+    cnt = onehot.sum(axis=0)
+    s1, s2 = Yk.sum(axis=0), (Yk * Yk).sum(axis=0)
+    fields = {
+        "sharpe": _sharpe(cnt, s1, s2),
+        "n_obs": cnt,
+    }
+    if moments:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = s1 / cnt
+            var = (s2 - s1 * mean) / (cnt - 1)
+            ok = (cnt >= min_obs) & (var > 0)
+            fields["mean"] = np.where(ok, mean + center_k, np.nan)
+            fields["std"] = np.where(ok, np.sqrt(var), np.nan)
+
+    if n_boot:
+        counts = resample_counts(len(X), n_boot, seed)
+        boot = _sharpe(counts @ onehot, counts @ Yk, counts @ (Yk * Yk))
+        with np.errstate(invalid="ignore"):
+            fields["lower"], fields["upper"] = np.nanpercentile(
+                boot, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=0
+            )
+
+    columns = pd.MultiIndex.from_product(
+        [list(fields), labels], names=["field", "regime"]
+    )
+    data = np.hstack([v.reshape(n_assets, n_regimes) for v in fields.values()])
+    return pd.DataFrame(data, index=returns.columns, columns=columns)
+
+
+@profiled
 def regime_conditioned_sharpe(
     returns: pd.Series,
     rf_rate: float = 0.0,
@@ -127,36 +408,260 @@ def regime_conditioned_sharpe(
             }
         )
 
-    # Quantile binning with duplicate handling
-    regimes = pd.qcut(
-        vol,
-        q=3,
-        labels=["Low Vol", "Mid Vol", "High Vol"],
-        duplicates="drop"
+    panel = regime_sharpe_panel(
+        returns.to_frame(), rf_rate=rf_rate, vol_window=vol_window, n_regimes=3
     )
+    return panel["sharpe"].iloc[0].rename(None).rename_axis(None)
 
-    sharpe_by_regime = {}
 
-    aligned_returns = returns.loc[vol.index]
-
-    for regime in regimes.cat.categories:
-        mask = regimes == regime
-        r = aligned_returns[mask]
-
-        if r.std() == 0 or len(r) < 5:
-            sharpe_by_regime[regime] = np.nan
-        else:
-            sharpe_by_regime[regime] = (
-                (r.mean() - rf_rate / 252) / r.std()
-            ) * np.sqrt(252)
+# -----------------------------------------------------------
+# BATCH PORTFOLIO EVALUATION
+# -----------------------------------------------------------
+@profiled
+def batch_portfolio_metrics(
+    returns: pd.DataFrame,
+    weights,
+    rf_rate: float = 0.0,
+    window: int = None,
+    n_boot: int = 0,
+    alpha: float = 0.05,
+    seed=None,
+    max_chunk_bytes: int = 64 * 1024 ** 2,
+) -> dict:
+    """
+    Evaluate many portfolios at once.
+
+    Parameters
+    ----------
+    returns : pd.DataFrame
+        Asset returns (dates x assets)
+    weights : pd.DataFrame or 2-D array
+        One weight vector per row (portfolios x assets); columns are
+        aligned to ``returns`` and each row is normalized to sum to 1
+    rf_rate : float
+        Annual risk-free rate
+    window : int or None
+        Rolling Sharpe window; skipped when None
+    n_boot : int
+        Bootstrap replicates for mean/Sharpe CIs; skipped when 0
+    alpha : float
+        Two-sided CI level
+    seed : int or None
+        Bootstrap seed (all portfolios share the same resamples)
+    max_chunk_bytes : int
+        Memory budget for the bootstrap counts plus one chunk of
+        portfolios. The (n_boot x dates) counts matrix is kept whole when
+        it needs at most half the budget, and otherwise regenerated in
+        row blocks for each chunk (same resamples, more draws)
+
+    Returns
+    -------
+    dict with
+      "summary": DataFrame (portfolios x [mean, vol, sharpe, ...]) with
+      daily mean, annualized vol and annualized Sharpe, plus
+      mean_lower/mean_upper/sharpe_lower/sharpe_upper when n_boot > 0
+      "rolling_sharpe": DataFrame (dates x portfolios) when window is set
+
+    Like ``portfolio_returns``, dates where any selected asset is missing
+    are dropped, so row ``i`` matches ``portfolio_returns(returns, w_i)``.
+    """
+    if returns is None or returns.empty:
+        raise ValueError("Returns are empty.")
 
-    return pd.Series(sharpe_by_regime)
+    if not isinstance(weights, pd.DataFrame):
+        weights = pd.DataFrame(np.atleast_2d(weights), columns=returns.columns)
 
+    common = returns.columns.intersection(weights.columns)
+    if common.empty:
+        raise ValueError("No overlapping assets between returns and weights.")
 
+    R = returns[common].dropna()
+    W = weights[common].to_numpy(dtype=float)
+    W = W / W.sum(axis=1, keepdims=True)
+    X = R.to_numpy()
+    n_obs = len(X)
+    daily_rf = rf_rate / 252
 
+    # The counts matrix takes its share of the budget first: whole if it
+    # fits in half, else streamed in row blocks of at most a quarter
+    # (float counts plus the integer draw they are converted from)
+    counts, block_rows, root = None, 0, None
+    budget = max_chunk_bytes
+    if n_boot:
+        counts_bytes = 8 * n_boot * n_obs
+        if counts_bytes <= max_chunk_bytes // 2:
+            counts = resample_counts(n_obs, n_boot, seed)
+            counts /= n_obs
+            budget -= counts_bytes
+        else:
+            block_rows = max(1, int(max_chunk_bytes // 4 // (16 * n_obs)))
+            budget -= 16 * block_rows * n_obs
+            root = seed_sequence(seed)
+
+    # Chunk portfolios so returns, squares and bootstrap moments fit budget
+    per_portfolio = 8 * (2 * n_obs + 2 * max(n_boot, 1))
+    chunk = max(1, int(budget // per_portfolio))
+    q = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+
+    def resampled_moments(P):
+        """Bootstrap means of ``P`` and ``P**2`` (n_boot x portfolios)."""
+        if counts is not None:
+            return counts @ P, counts @ (P * P)
+        m1 = np.empty((n_boot, P.shape[1]))
+        m2 = np.empty((n_boot, P.shape[1]))
+        P2 = P * P
+        # Spawning advances a SeedSequence, so each chunk redraws the same
+        # resamples from a fresh copy of the root
+        fresh = np.random.SeedSequence(
+            root.entropy, spawn_key=root.spawn_key, pool_size=root.pool_size,
+            n_children_spawned=root.n_children_spawned,
+        )
+        for lo, block in iter_resample_counts(n_obs, n_boot, fresh, block_rows):
+            block /= n_obs
+            m1[lo:lo + len(block)] = block @ P
+            m2[lo:lo + len(block)] = block @ P2
+        return m1, m2
+
+    summaries = []
+    rolling = []
+    for start in range(0, len(W), chunk):
+        P = X @ W[start:start + chunk].T  # (dates, portfolios)
+        labels = weights.index[start:start + chunk]
+
+        mean = P.mean(axis=0)
+        std = P.std(axis=0, ddof=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            part = {
+                "mean": mean,
+                "vol": std * np.sqrt(252),
+                "sharpe": (mean - daily_rf) / std * np.sqrt(252),
+            }
 
+            if n_boot:
+                m1, m2 = resampled_moments(P)
+                boot_std = np.sqrt(np.maximum(m2 - m1 ** 2, 0.0) * n_obs / (n_obs - 1))
+                boot_sharpe = (m1 - daily_rf) / boot_std * np.sqrt(252)
+                part["mean_lower"], part["mean_upper"] = np.percentile(m1, q, axis=0)
+                part["sharpe_lower"], part["sharpe_upper"] = np.nanpercentile(
+                    boot_sharpe, q, axis=0
+                )
 
+        summaries.append(pd.DataFrame(part, index=labels))
+        if window:
+            rolling.append(
+                rolling_sharpe(pd.DataFrame(P, index=R.index, columns=labels), rf_rate, window)
+            )
 
+    out = {"summary": pd.concat(summaries)}
+    if window:
+        out["rolling_sharpe"] = pd.concat(rolling, axis=1)
+    return out
 
 
+# -----------------------------------------------------------
+# PORTFOLIO MOMENT SUMMARY (weights-only fast path)
+# -----------------------------------------------------------
+@profiled
+def moment_summary(returns: pd.DataFrame, comoments="auto", max_comoment_assets=30) -> dict:
+    """
+    Per-universe moments from which any portfolio's summary metrics follow
+    without touching the return history again.
+
+    Parameters
+    ----------
+    returns : pd.DataFrame
+        Asset returns (dates x assets); dates with any NaN are dropped,
+        as ``portfolio_returns`` does for a portfolio holding every asset
+    comoments : bool or "auto"
+        Also store the third and fourth central co-moment tensors
+        (k**3 and k**4 entries) for portfolio skewness and kurtosis;
+        "auto" does so up to ``max_comoment_assets`` assets
+    max_comoment_assets : int
+        Asset limit for ``comoments="auto"``
+
+    Returns
+    -------
+    dict with assets (Index), n_obs, mean (k,), cov (k, k; ddof=1) and,
+    with co-moments, m3 (k*k, k) and m4 (k*k, k*k) as flattened biased
+    central co-moments.
+    """
+    if returns is None or returns.empty:
+        raise ValueError("Returns are empty.")
 
+    R = returns.dropna()
+    X = R.to_numpy(dtype=float)
+    n, k = X.shape
+    if n < 2:
+        raise ValueError("Need at least two complete return rows.")
+
+    mean = X.mean(axis=0)
+    Y = X - mean
+    out = {
+        "assets": R.columns,
+        "n_obs": n,
+        "mean": mean,
+        "cov": Y.T @ Y / (n - 1),
+    }
+
+    if comoments == "auto":
+        comoments = k <= max_comoment_assets
+    if comoments:
+        # Pairwise products turn both tensors into single matmuls
+        Z = (Y[:, :, None] * Y[:, None, :]).reshape(n, k * k)
+        out["m3"] = Z.T @ Y / n
+        out["m4"] = Z.T @ Z / n
+    return out
+
+
+def portfolio_moment_metrics(summary: dict, weights, rf_rate: float = 0.0) -> dict:
+    """
+    Summary metrics of a weighted portfolio from ``moment_summary``, in
+    O(k**2) (O(k**4) for kurtosis).
+
+    Weights are aligned to the summary's assets (missing assets get zero
+    weight) and normalized to sum to 1. Results equal those computed from
+    ``portfolio_returns`` over the same complete rows.
+
+    Returns
+    -------
+    dict with n_obs, mean (daily), vol (annualized, ddof=1), sharpe
+    (annualized, excess of ``rf_rate``) and, when the summary holds
+    co-moments, sigma (daily, ddof=0), skew, kurtosis (excess) and
+    jarque_bera_p, as in ``fit_return_distribution``.
+    """
+    if not isinstance(weights, pd.Series):
+        weights = pd.Series(weights)
+    if summary["assets"].intersection(weights.index).empty:
+        raise ValueError("No overlapping assets between summary and weights.")
+
+    w = weights.reindex(summary["assets"]).fillna(0.0).to_numpy(dtype=float)
+    w = w / w.sum()
+    n = summary["n_obs"]
+
+    mean = float(w @ summary["mean"])
+    var = float(w @ summary["cov"] @ w)
+    std = np.sqrt(var)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = {
+            "n_obs": n,
+            "mean": mean,
+            "vol": float(std * np.sqrt(252)),
+            "sharpe": float((mean - rf_rate / 252) / std * np.sqrt(252)),
+        }
+
+    if "m3" in summary:
+        ww = np.outer(w, w).ravel()
+        m2 = var * (n - 1) / n
+        m3 = float(ww @ summary["m3"] @ w)
+        m4 = float(ww @ summary["m4"] @ ww)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            skew = m3 / m2 ** 1.5
+            kurt = m4 / m2 ** 2 - 3.0
+        jb = n / 6.0 * (skew ** 2 + kurt ** 2 / 4.0)
+        out.update({
+            "sigma": float(np.sqrt(m2)),
+            "skew": skew,
+            "kurtosis": kurt,
+            "jarque_bera_p": float(np.exp(-jb / 2)),  # chi2(2) survival
+        })
+    return out
@@ -0,0 +1,354 @@
+# src/batch.py
+"""
+Headless batch runner for the dashboard analytics.
+
+    python -m src.batch config.yaml
+
+Config (YAML or JSON):
+
+    start: 2021-01-01
+    end: 2024-01-01                        # exclusive: dates in [start, end)
+    rf_rate: 0.03
+    window: 126
+    n_boot: 800
+    bootstrap_mode: poisson                # or exact (the dashboard's mode)
+    dtype: float32                         # compact returns/bootstrap buffers
+    seed: 12345
+    n_jobs: 8
+    output: results/summary.parquet        # .parquet or .csv
+    timeseries_output: results/rolling.csv # optional, long format
+    prices_file: prices.parquet            # optional, skips downloading
+    panel: true                            # read the shared panel when it
+                                           # covers the run (src.universe)
+    portfolios:                            # and/or portfolios_file (CSV
+      - name: tech                         # with name,ticker,quantity)
+        holdings: {AAPL: 10, MSFT: 5}
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from src.analysis import (
+    compute_returns,
+    portfolio_returns,
+    regime_conditioned_sharpe,
+    rolling_sharpe
+)
+from src.bootstrap import rolling_bootstrap_ci
+from src.data_fetch import fetch_prices
+from src.distributions import fit_return_distribution
+from src.parallel import resolve_n_jobs
+from src.universe import open_panel
+
+DEFAULTS = {
+    "rf_rate": 0.03,
+    "window": 126,
+    "n_boot": 800,
+    "bootstrap_mode": "poisson",
+    "dtype": "float64",
+    "seed": 12345,
+    "n_jobs": 1,
+    "flush_every": 200,
+    "timeseries_flush_rows": 100_000,
+    "panel": False,
+}
+
+# Fixed output schema; failed portfolios leave metric columns empty
+SUMMARY_COLUMNS = [
+    "portfolio", "status", "n_obs", "mean", "vol", "sharpe",
+    "rolling_sharpe_last", "ci_lower_last", "ci_upper_last",
+    "regime_sharpe_Low Vol", "regime_sharpe_Mid Vol", "regime_sharpe_High Vol",
+    "skew", "kurtosis", "jarque_bera_p", "t_df", "t_loc", "t_scale",
+]
+
+
+# -----------------------------------------------------------
+# 1. CONFIG & INPUTS
+# -----------------------------------------------------------
+def load_config(path) -> dict:
+    with open(path) as fh:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError(
+                    f"{path}: YAML configs need PyYAML (pip install pyyaml); "
+                    "or write the config as JSON."
+                ) from None
+            config = yaml.safe_load(fh)
+        else:
+            config = json.load(fh)
+    return {**DEFAULTS, **config}
+
+
+def load_portfolios(config) -> list:
+    """List of ``(name, {ticker: quantity})`` from the config."""
+    portfolios = [
+        (str(p["name"]), {t: float(q) for t, q in p["holdings"].items()})
+        for p in config.get("portfolios", [])
+    ]
+    if config.get("portfolios_file"):
+        rows = pd.read_csv(config["portfolios_file"])
+        for name, group in rows.groupby("name", sort=False):
+            portfolios.append(
+                (str(name), dict(zip(group["ticker"], group["quantity"].astype(float))))
+            )
+    if not portfolios:
+        raise ValueError("Config lists no portfolios.")
+    return portfolios
+
+
+def load_panel(config, tickers):
+    """The shared panel if enabled and covering the run, else None."""
+    if not config["panel"] or config.get("prices_file"):
+        return None
+    panel = open_panel(config["panel"] if isinstance(config["panel"], str) else None)
+    if panel is None or not panel.covers(tickers, config["start"], config["end"]):
+        return None
+    return panel
+
+
+def load_returns(config, tickers, panel=None) -> pd.DataFrame:
+    if panel is not None:
+        returns = panel.returns(sorted(tickers), config["start"], config["end"])
+        return returns if config["dtype"] == "float64" else returns.astype(config["dtype"])
+    if config.get("prices_file"):
+        path = config["prices_file"]
+        prices = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(
+            path, index_col=0, parse_dates=True
+        )
+        # [start, end), like fetch_prices and the shared panel
+        dates = pd.DatetimeIndex(prices.index)
+        start, end = pd.Timestamp(config["start"]), pd.Timestamp(config["end"])
+        prices = prices[(dates >= start) & (dates < end)]
+    else:
+        prices = fetch_prices(sorted(tickers), config["start"], config["end"])
+    return compute_returns(prices.dropna(how="all"), dtype=config["dtype"])
+
+
+# -----------------------------------------------------------
+# 2. PER-PORTFOLIO PIPELINE (runs in workers)
+# -----------------------------------------------------------
+_RETURNS = None
+_CONFIG = None
+
+
+def _init_worker(returns, config):
+    global _RETURNS, _CONFIG
+    if isinstance(returns, tuple):
+        # (SharedPanel, tickers): map the panel instead of unpickling a copy
+        returns = load_returns(config, returns[1], panel=returns[0])
+    _RETURNS, _CONFIG = returns, config
+
+
+def evaluate_portfolio(name, holdings):
+    """
+    Run the dashboard pipeline for one portfolio.
+
+    Returns ``(summary_row, timeseries_frame_or_None)``.
+    """
+    config = _CONFIG
+    row = {"portfolio": name, "status": "ok"}
+    try:
+        weights = pd.Series(holdings, dtype=float)
+        weights = weights[weights > 0]
+        missing = sorted(set(weights.index) - set(_RETURNS.columns))
+        if missing:
+            raise ValueError(f"no prices for {missing}")
+
+        port_ret = portfolio_returns(_RETURNS, weights)
+        rf_rate, window = config["rf_rate"], config["window"]
+
+        rolling_sh = rolling_sharpe(port_ret, rf_rate, window)
+        regime_sh = regime_conditioned_sharpe(port_ret, rf_rate)
+        ci_df = rolling_bootstrap_ci(
+            port_ret, window=window, n_boot=config["n_boot"],
+            mode=config["bootstrap_mode"], seed=config["seed"], dtype=config["dtype"]
+        )
+        dist = fit_return_distribution(port_ret)
+
+        row.update({
+            "n_obs": len(port_ret),
+            "mean": port_ret.mean(),
+            "vol": port_ret.std() * np.sqrt(252),
+            "sharpe": (port_ret.mean() - rf_rate / 252) / port_ret.std() * np.sqrt(252),
+            "rolling_sharpe_last": rolling_sh.iloc[-1] if len(rolling_sh) else np.nan,
+            "ci_lower_last": ci_df["lower"].iloc[-1] if len(ci_df) else np.nan,
+            "ci_upper_last": ci_df["upper"].iloc[-1] if len(ci_df) else np.nan,
+        })
+        row.update({f"regime_sharpe_{k}": v for k, v in regime_sh.items()})
+        if "normal" in dist:
+            row.update({
+                "skew": dist["normal"]["skew"],
+                "kurtosis": dist["normal"]["kurtosis"],
+                "jarque_bera_p": dist["jarque_bera_p"],
+            })
+        if isinstance(dist.get("student_t"), dict):
+            row.update({f"t_{k}": dist["student_t"][k] for k in ("df", "loc", "scale")})
+
+        series = pd.DataFrame({
+            "portfolio": name,
+            "rolling_sharpe": rolling_sh,
+            "ci_mean": ci_df["mean"],
+            "ci_lower": ci_df["lower"],
+            "ci_upper": ci_df["upper"],
+        }).rename_axis("date").reset_index()
+        return row, series
+
+    except Exception as e:  # one bad portfolio must not stop the batch
+        row["status"] = f"error: {e}"
+        return row, None
+
+
+# -----------------------------------------------------------
+# 3. STREAMING OUTPUT
+# -----------------------------------------------------------
+class ResultWriter:
+    """Buffers rows and appends them to a CSV or Parquet file."""
+
+    def __init__(self, path, flush_every=200):
+        self.path = path
+        self.flush_every = flush_every
+        self._buffer = []
+        self._parquet = None
+        self._wrote_csv = False
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, frame):
+        self._buffer.append(frame)
+        if sum(len(f) for f in self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        frame = pd.concat(self._buffer, ignore_index=True)
+        self._buffer = []
+
+        if self.path.endswith(".parquet"):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            else:
+                table = table.cast(self._parquet.schema)
+            self._parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode="a", header=not self._wrote_csv, index=False)
+            self._wrote_csv = True
+
+    def close(self):
+        self.flush()
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+class Progress:
+    """Throttled progress and throughput report on stderr."""
+
+    def __init__(self, total, every=1.0, stream=None):
+        self.total, self.every = total, every
+        self.stream = stream if stream is not None else sys.stderr  # resolved late for redirection
+        self.done = self.failed = 0
+        self.t0 = self._last = time.perf_counter()
+
+    def update(self, ok):
+        self.done += 1
+        self.failed += not ok
+        now = time.perf_counter()
+        if now - self._last >= self.every or self.done == self.total:
+            self._last = now
+            rate = self.done / max(now - self.t0, 1e-9)
+            eta = (self.total - self.done) / rate if rate else float("inf")
+            print(
+                f"[{self.done}/{self.total}] {rate:.1f} portfolios/s, "
+                f"{self.failed} failed, eta {eta:.0f}s",
+                file=self.stream,
+            )
+
+
+# -----------------------------------------------------------
+# 4. DRIVER
+# -----------------------------------------------------------
+def run(config) -> dict:
+    """Evaluate every portfolio in ``config``; returns run statistics."""
+    portfolios = load_portfolios(config)
+    tickers = {t for _, holdings in portfolios for t in holdings}
+    panel = load_panel(config, tickers)
+    returns = load_returns(config, tickers, panel)
+
+    summary = ResultWriter(config["output"], config["flush_every"])
+    series = (
+        ResultWriter(config["timeseries_output"], config["timeseries_flush_rows"])
+        if config.get("timeseries_output") else None
+    )
+    progress = Progress(len(portfolios))
+
+    def consume(result):
+        row, frame = result
+        summary.write(
+            pd.DataFrame([row]).reindex(columns=SUMMARY_COLUMNS)
+            .astype({c: float for c in SUMMARY_COLUMNS[2:]})
+        )
+        if series is not None and frame is not None:
+            series.write(frame)
+        progress.update(row["status"] == "ok")
+
+    n_jobs = resolve_n_jobs(config["n_jobs"])
+    try:
+        if n_jobs == 1:
+            _init_worker(returns, config)
+            for name, holdings in portfolios:
+                consume(evaluate_portfolio(name, holdings))
+        else:
+            with ProcessPoolExecutor(
+                max_workers=n_jobs, initializer=_init_worker,
+                initargs=((panel, tickers) if panel is not None else returns, config)
+            ) as pool:
+                futures = [pool.submit(evaluate_portfolio, n, h) for n, h in portfolios]
+                for future in as_completed(futures):
+                    consume(future.result())
+    finally:
+        summary.close()
+        if series is not None:
+            series.close()
+
+    elapsed = time.perf_counter() - progress.t0
+    return {
+        "portfolios": progress.done,
+        "failed": progress.failed,
+        "seconds": elapsed,
+        "portfolios_per_second": progress.done / max(elapsed, 1e-9),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the analytics pipeline over many portfolios.")
+    parser.add_argument("config", help="YAML or JSON config file")
+    parser.add_argument("--n-jobs", type=int, help="override worker processes (-1 = all cores)")
+    parser.add_argument("--output", help="override summary output path")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.n_jobs is not None:
+        config["n_jobs"] = args.n_jobs
+    if args.output:
+        config["output"] = args.output
+
+    stats = run(config)
+    print(json.dumps(stats), file=sys.stderr)
+    return 1 if stats["failed"] == stats["portfolios"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+# src/cache.py
+import copy
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# -----------------------------------------------------------
+# 1. CONTENT HASHING
+# -----------------------------------------------------------
+def _feed(h, obj):
+    """Feed a canonical byte representation of ``obj`` into hash ``h``."""
+    if isinstance(obj, (pd.Series, pd.DataFrame)):
+        h.update(type(obj).__name__.encode())
+        h.update(pd.util.hash_pandas_object(obj, index=True).values.tobytes())
+        if isinstance(obj, pd.DataFrame):
+            _feed(h, list(obj.columns))
+            _feed(h, [str(d) for d in obj.dtypes])
+        else:
+            _feed(h, obj.name)
+            _feed(h, str(obj.dtype))
+    elif isinstance(obj, np.ndarray):
+        h.update(b"ndarray")
+        h.update(str(obj.dtype).encode())
+        h.update(repr(obj.shape).encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}{len(obj)}".encode())
+        for item in obj:
+            _feed(h, item)
+    elif isinstance(obj, dict):
+        h.update(f"dict{len(obj)}".encode())
+        for k in sorted(obj, key=repr):
+            _feed(h, k)
+            _feed(h, obj[k])
+    elif isinstance(obj, functools.partial):
+        _feed(h, obj.func)
+        _feed(h, obj.args)
+        _feed(h, obj.keywords)
+    elif callable(obj):
+        h.update(f"{obj.__module__}.{obj.__qualname__}".encode())
+    else:
+        h.update(f"{type(obj).__name__}:{obj!r}".encode())
+
+
+def _source_version() -> str:
+    """Digest of the analytics sources (``src/*.py``)."""
+    h = hashlib.blake2b(digest_size=8)
+    root = os.path.dirname(os.path.abspath(__file__))
+    for name in sorted(os.listdir(root)):
+        if name.endswith(".py"):
+            h.update(name.encode())
+            with open(os.path.join(root, name), "rb") as fh:
+                h.update(fh.read())
+    return h.hexdigest()
+
+
+# Salts every hash so results cached by other code are never served
+CODE_VERSION = os.environ.get("RESULT_CACHE_VERSION") or _source_version()
+
+
+def hash_inputs(*args, **kwargs) -> str:
+    """
+    Fast content hash of arrays, pandas objects and plain parameters,
+    salted with ``CODE_VERSION``.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    h.update(CODE_VERSION.encode())
+    _feed(h, args)
+    _feed(h, kwargs)
+    return h.hexdigest()
+
+
+def code_digest(func) -> str:
+    """Digest of the bytecode and constants of ``func`` (and nested code)."""
+    h = hashlib.blake2b(digest_size=8)
+
+    def feed(code):
+        h.update(code.co_code)
+        for const in code.co_consts:
+            if inspect.iscode(const):
+                feed(const)
+            else:
+                h.update(repr(const).encode())
+
+    code = getattr(inspect.unwrap(func), "__code__", None)
+    if code is not None:
+        feed(code)
+    return h.hexdigest()
+
+
+_IMMUTABLE = (str, bytes, int, float, complex, bool, type(None), np.generic, frozenset, range)
+
+
+def _copy_on_write() -> bool:
+    """True if pandas gives every write to a shallow copy its own buffer."""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    return pd.get_option("mode.copy_on_write") is True
+
+
+def _protect(value, detach=False):
+    """
+    Version of ``value`` that callers may not corrupt the cache through.
+
+    Pandas objects become shallow copies under Copy-on-Write (any write
+    gets its own buffer) and deep copies otherwise (pandas 2.x default),
+    arrays become read-only views and containers are rebuilt around
+    protected items; other mutable objects are deep-copied. With
+    ``detach`` arrays are copied first, cutting ties to the caller's
+    original.
+    """
+    if isinstance(value, _IMMUTABLE):
+        return value
+    if isinstance(value, (pd.Series, pd.DataFrame, pd.Index)):
+        return value.copy(deep=not _copy_on_write())
+    if isinstance(value, np.ndarray):
+        view = (value.copy() if detach else value).view()
+        view.flags.writeable = False
+        return view
+    if type(value) is dict:
+        return {k: _protect(v, detach) for k, v in value.items()}
+    if type(value) in (list, tuple):
+        return type(value)(_protect(v, detach) for v in value)
+    return copy.deepcopy(value)
+
+
+def _sizeof(value) -> int:
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if isinstance(usage, pd.Series) else usage)
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(_sizeof(v) for v in value)
+    if hasattr(value, "to_plotly_json"):
+        # Plotly figures hold their data in nested dicts getsizeof misses
+        return len(value.to_json())
+    return sys.getsizeof(value)
+
+
+# -----------------------------------------------------------
+# 2. TWO-TIER CACHE
+# -----------------------------------------------------------
+class ResultCache:
+    """
+    Content-addressed result cache.
+
+    The memory tier is an LRU bounded by ``max_bytes`` (estimated result
+    size). The optional disk tier stores pickles under ``disk_dir`` so that
+    Streamlit sessions and worker processes on one host share results;
+    files are written atomically and never evicted automatically.
+
+    Entries are shared between callers, so ``put`` stores a detached copy
+    and ``get`` hands out protected views (see ``_protect``): pandas
+    results may be modified freely, arrays are read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 ** 2, disk_dir=None):
+        self.max_bytes = int(max_bytes)
+        self.disk_dir = os.path.expanduser(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(
+            ["hits", "memory_hits", "disk_hits", "misses", "bypassed", "evictions"], 0
+        )
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.pkl")
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _remember(self, key, value, size):
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self._counts["evictions"] += 1
+
+    def get(self, key):
+        """Return ``(True, value)`` on a hit, ``(False, None)`` otherwise."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._counts["hits"] += 1
+                self._counts["memory_hits"] += 1
+                return True, _protect(self._entries[key][0])
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), "rb") as fh:
+                    value = pickle.load(fh)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            else:
+                self._remember(key, value, _sizeof(value))
+                self._count("hits")
+                self._count("disk_hits")
+                return True, _protect(value)
+
+        self._count("misses")
+        return False, None
+
+    def put(self, key, value):
+        self._remember(key, _protect(value, detach=True), _sizeof(value))
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with open(tmp, "wb") as fh:
+                pickle.dump(value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+
+    def stats(self) -> dict:
+        """Hit/miss counters plus current memory-tier occupancy."""
+        with self._lock:
+            out = dict(self._counts)
+            out["entries"] = len(self._entries)
+            out["bytes"] = self._bytes
+        lookups = out["hits"] + out["misses"]
+        out["hit_rate"] = out["hits"] / lookups if lookups else 0.0
+        return out
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            for name in self._counts:
+                self._counts[name] = 0
+        if disk and self.disk_dir:
+            for root, _, files in os.walk(self.disk_dir):
+                for name in files:
+                    if name.endswith(".pkl"):
+                        os.remove(os.path.join(root, name))
+
+
+RESULT_CACHE = ResultCache(
+    max_bytes=int(os.environ.get("RESULT_CACHE_MB", "256")) * 1024 ** 2,
+    disk_dir=os.environ.get("RESULT_CACHE_DIR") or None,
+)
+
+
+# -----------------------------------------------------------
+# 3. DECORATOR
+# -----------------------------------------------------------
+def cached(func=None, *, cache=None, ignore=("n_jobs", "executor"), seed_param="seed"):
+    """
+    Memoize an analytics function on a content hash of its inputs.
+
+    The key covers the function's qualified name and every bound argument
+    (defaults included) except those in ``ignore``, which must not affect
+    the result. Calls whose ``seed_param`` is None are random and bypass
+    the cache. ``wrapper.cache`` exposes the backing ``ResultCache``.
+    """
+    if func is None:
+        return functools.partial(cached, cache=cache, ignore=ignore, seed_param=seed_param)
+
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        store = cache if cache is not None else RESULT_CACHE
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = {k: v for k, v in bound.arguments.items() if k not in ignore}
+
+        if seed_param in params and params[seed_param] is None:
+            store._count("bypassed")
+            return func(*args, **kwargs)
+
+        key = hash_inputs(name, params)
+        hit, value = store.get(key)
+        if hit:
+            return value
+        value = func(*args, **kwargs)
+        store.put(key, value)
+        return value
+
+    wrapper.cache = cache if cache is not None else RESULT_CACHE
+    return wrapper
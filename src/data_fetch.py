@@ -1,45 +1,187 @@
-import yfinance as yf
+import threading
+import time
+
 import pandas as pd
 
-def fetch_prices(tickers, start, end):
-    # Ensure tickers is a list, even if a single string is passed
-    if isinstance(tickers, str):
-        tickers = [tickers]
-        
-    try:
-        data = yf.download(
-            tickers=tickers,
-            start=start,
-            end=end,
-            progress=False,
-            auto_adjust=True,
-            threads=False
-        )
+from src.fetch_scheduler import FetchScheduler
+from src.instrumentation import profiled
+from src.price_store import default_store
+
+
+# -----------------------------------------------------------
+# 1. PRICE PROVIDERS
+# -----------------------------------------------------------
+class RateLimitError(RuntimeError):
+    """Provider refused the request (HTTP 429); retry after a pause."""
+
+    def __init__(self, message="rate limited", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class YahooProvider:
+    """Adjusted daily closes from Yahoo Finance via yfinance."""
+
+    def fetch(self, tickers, start, end) -> pd.DataFrame:
+        import yfinance as yf
+
+        try:
+            data = yf.download(
+                tickers=tickers,
+                start=start,
+                end=end,
+                progress=False,
+                auto_adjust=True,
+                threads=False
+            )
+        except Exception as e:
+            if "RateLimit" in type(e).__name__:
+                raise RateLimitError(str(e)) from e
+            raise
 
         # 1. Handle missing/empty data immediately
         if data is None or data.empty:
-            return pd.DataFrame() # Return empty DF instead of None to prevent crashes
+            return pd.DataFrame(columns=tickers)
 
         # 2. Extract 'Close' and FORCE into a DataFrame
         if "Close" in data.columns:
             prices = data["Close"]
         else:
             # Fallback if auto_adjust=True changed the name
-            prices = data.iloc[:, 0] 
+            prices = data.iloc[:, 0]
 
         # 3. Enforcement: Convert Series to DataFrame if necessary
         if isinstance(prices, pd.Series):
-            prices = prices.to_frame()
-            
-        # 4. Standardize column names
-        # This ensures your DF always has the tickers as column headers
-        prices.columns = tickers
+            prices = prices.to_frame(tickers[0])
+        elif len(tickers) == 1:
+            prices.columns = tickers
 
-        return prices
+        # 4. Standardize column order to the requested tickers
+        return prices.reindex(columns=tickers)
 
-    except Exception as e:
-        print(f"Error fetching data: {e}")
-        return pd.DataFrame()
 
+class LocalProvider:
+    """
+    Offline provider serving closes from an in-memory DataFrame
+    (dates x tickers). Records each call so tests can assert what was
+    fetched.
+
+    To exercise the fetch scheduler it can simulate a slow, throttled
+    server: every call sleeps ``latency`` seconds, calls beyond
+    ``max_calls_per_sec`` within one second raise ``RateLimitError``, and
+    any request containing a ticker in ``failing`` raises ``KeyError``.
+    With ``silent=True`` both come back the way ``yf.download`` reports
+    them instead: all-NaN columns for the affected tickers.
+    """
+
+    def __init__(
+        self, prices: pd.DataFrame, latency=0.0, max_calls_per_sec=None, failing=(), silent=False
+    ):
+        self.prices = prices.sort_index()
+        self.latency = latency
+        self.max_calls_per_sec = max_calls_per_sec
+        self.failing = set(failing)
+        self.silent = silent
+        self.calls = []
+        self.call_times = []
+        self.rejected = 0
+        self._recent = []
+        self._lock = threading.Lock()
+
+    def fetch(self, tickers, start, end) -> pd.DataFrame:
+        idx = self.prices.index
+        rows = (idx >= pd.Timestamp(start)) & (idx < pd.Timestamp(end))
+        frame = self.prices.loc[rows].reindex(columns=tickers)
+
+        with self._lock:
+            now = time.monotonic()
+            self.call_times.append(now)
+            self._recent = [t for t in self._recent if now - t < 1.0]
+            throttled = bool(self.max_calls_per_sec) and len(self._recent) >= self.max_calls_per_sec
+            if throttled:
+                self.rejected += 1
+                if not self.silent:
+                    raise RateLimitError("429 Too Many Requests")
+            else:
+                self._recent.append(now)
+            self.calls.append((list(tickers), start, end))
 
+        if self.latency:
+            time.sleep(self.latency)
+        if throttled:
+            return frame * float("nan")
+        bad = self.failing.intersection(tickers)
+        if bad:
+            if not self.silent:
+                raise KeyError(f"unknown tickers {sorted(bad)}")
+            frame[sorted(bad)] = float("nan")
+        return frame
 
+
+# -----------------------------------------------------------
+# 2. STORE-BACKED FETCH
+# -----------------------------------------------------------
+@profiled
+def fetch_prices(
+    tickers, start, end, store=None, provider=None, scheduler=None, return_status=False
+):
+    """
+    Daily closes (dates x tickers) for ``[start, end)``.
+
+    Prices are served from the on-disk ``PriceStore`` (``store=None`` uses
+    ``default_store()``; ``store=False`` bypasses it). Only the head/tail
+    date ranges the store has not covered yet are downloaded, through a
+    ``FetchScheduler`` over ``provider`` (Yahoo by default), and appended
+    to the store. Tickers whose download failed are left out of the result
+    rather than emptying it.
+
+    With ``return_status=True`` returns ``(prices, status)`` where
+    ``status`` has one row per (ticker, missing range) download.
+    """
+    # Ensure tickers is a list, even if a single string is passed
+    if isinstance(tickers, str):
+        tickers = [tickers]
+
+    scheduler = scheduler or FetchScheduler(provider or YahooProvider())
+    reports = []
+
+    try:
+        if store is False:
+            prices, status = scheduler.fetch(tickers, start, end)
+            reports.append(status.assign(start=start, end=end))
+            prices = prices.reindex(columns=[t for t in tickers if t in prices])
+        else:
+            store = store or default_store()
+
+            # Group tickers by missing range so each range is one download
+            pending = {}
+            for ticker in tickers:
+                for gap in store.missing_ranges(ticker, start, end):
+                    pending.setdefault(gap, []).append(ticker)
+
+            for (lo, hi), group in pending.items():
+                fetched, status = scheduler.fetch(group, lo, hi)
+                reports.append(status.assign(start=lo, end=hi))
+                # Failed and empty downloads are not recorded, so the range
+                # is retried on the next request
+                for ticker in status.index[status["status"] == "ok"]:
+                    store.append(ticker, fetched[ticker], lo, hi)
+
+            prices = pd.concat([store.read(t, start, end) for t in tickers], axis=1)
+            prices = prices.reindex(columns=tickers)
+
+        # Return empty DF instead of None to prevent crashes
+        prices = prices.dropna(how="all").dropna(axis=1, how="all").sort_index()
+        if prices.empty:
+            prices = pd.DataFrame()
+
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+        prices = pd.DataFrame()
+
+    if return_status:
+        status = pd.concat(reports) if reports else pd.DataFrame(
+            columns=["status", "attempts", "n_obs", "error", "start", "end"]
+        )
+        return prices, status
+    return prices
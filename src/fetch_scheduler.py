@@ -0,0 +1,191 @@
+# src/fetch_scheduler.py
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+
+# -----------------------------------------------------------
+# 1. TOKEN BUCKET
+# -----------------------------------------------------------
+class TokenBucket:
+    """
+    Thread-safe token bucket: ``rate`` requests per second on average,
+    with bursts of up to ``capacity`` requests.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("rate must be positive.")
+        self.rate = float(rate)
+        self.capacity = float(max(capacity, 1))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._last) * self.rate
+                )
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            self._sleep(wait)
+
+
+# -----------------------------------------------------------
+# 2. SCHEDULER
+# -----------------------------------------------------------
+# A range at least this long always holds trading days, so coming back
+# empty means throttled or failed. Shorter ones (today, a weekend) can be
+# legitimately empty; those are not retried here, and since empty results
+# are not stored the next request asks again anyway.
+MIN_EXPECTED_SPAN = pd.Timedelta(days=7)
+
+
+def _has_prices(series) -> bool:
+    return series is not None and bool(series.notna().any())
+
+
+def _expects_prices(start, end) -> bool:
+    return pd.Timestamp(end) - pd.Timestamp(start) >= MIN_EXPECTED_SPAN
+
+
+class FetchScheduler:
+    """
+    Concurrent, rate-limited price downloads.
+
+    Tickers are split into batches of ``batch_size`` that run on a pool of
+    ``max_workers`` threads. Every provider request first takes a token
+    from a shared ``TokenBucket``. If a whole batch request fails, each of
+    its tickers is retried on its own with exponential backoff (plus
+    jitter) up to ``max_retries`` times, so one bad ticker or a burst of
+    429s cannot empty the whole portfolio.
+
+    Tickers that come back missing or all-NaN are retried the same way
+    (together, after a backoff) when prices were expected: Yahoo reports
+    per-ticker throttling and errors that way instead of raising. Prices
+    are expected when another ticker of the batch got some or the range
+    spans ``MIN_EXPECTED_SPAN``.
+
+    Per-ticker status is one of ``"ok"``, ``"empty"`` (requests succeeded
+    but returned no prices, even after retries) or ``"failed"``.
+    """
+
+    def __init__(
+        self,
+        provider,
+        batch_size=10,
+        max_workers=4,
+        rate=2.0,
+        burst=4,
+        max_retries=3,
+        backoff=1.0,
+        max_backoff=30.0,
+        sleep=time.sleep,
+    ):
+        self.provider = provider
+        self.batch_size = max(1, int(batch_size))
+        self.max_workers = max(1, int(max_workers))
+        self.bucket = TokenBucket(rate, burst, sleep=sleep)
+        self.max_retries = int(max_retries)
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self._sleep = sleep
+
+    def _request(self, tickers, start, end):
+        self.bucket.acquire()
+        return self.provider.fetch(tickers, start, end)
+
+    def _delay(self, attempt, error):
+        # Honour a server-supplied Retry-After (see RateLimitError)
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after:
+            return min(self.max_backoff, float(retry_after))
+        base = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        return base * (0.5 + random.random())
+
+    def _fetch_single(self, ticker, start, end, first_attempt=1):
+        error = None
+        attempt = first_attempt
+        for attempt in range(first_attempt, self.max_retries + 1):
+            try:
+                series = self._request([ticker], start, end).get(ticker)
+                if _has_prices(series) or not _expects_prices(start, end):
+                    return ticker, series, attempt, None
+                error = None
+            except Exception as e:  # provider errors are reported, not raised
+                error = e
+            if attempt < self.max_retries:
+                self._sleep(self._delay(attempt, error))
+        return ticker, None, attempt, error
+
+    def _fetch_batch(self, batch, start, end, attempt=1, expected=False):
+        try:
+            frame = self._request(batch, start, end)
+        except Exception:
+            # Isolate the failure: retry every ticker on its own
+            return [self._fetch_single(t, start, end, attempt) for t in batch]
+
+        outcomes = {t: (t, frame.get(t), attempt, None) for t in batch}
+        missing = [t for t in batch if not _has_prices(outcomes[t][1])]
+        expected = expected or len(missing) < len(batch) or _expects_prices(start, end)
+        if missing and expected and attempt < self.max_retries:
+            # Silently throttled or failed tickers: back off and ask again
+            self._sleep(self._delay(attempt, None))
+            for outcome in self._fetch_batch(missing, start, end, attempt + 1, expected):
+                outcomes[outcome[0]] = outcome
+        return [outcomes[t] for t in batch]
+
+    def fetch(self, tickers, start, end):
+        """
+        Download ``[start, end)`` closes for ``tickers``.
+
+        Returns
+        -------
+        (prices, status) where ``prices`` holds the tickers that returned
+        data and ``status`` is a DataFrame indexed by ticker with columns
+        status, attempts, n_obs and error.
+        """
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        batches = [
+            tickers[i:i + self.batch_size]
+            for i in range(0, len(tickers), self.batch_size)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [pool.submit(self._fetch_batch, b, start, end) for b in batches]
+            outcomes = [o for f in futures for o in f.result()]
+
+        columns = {}
+        rows = {}
+        for ticker, series, attempts, error in outcomes:
+            if error is not None:
+                state, n_obs = "failed", 0
+            else:
+                series = series.dropna() if series is not None else pd.Series(dtype=float)
+                n_obs = len(series)
+                state = "ok" if n_obs else "empty"
+                if n_obs:
+                    columns[ticker] = series
+            rows[ticker] = {
+                "status": state,
+                "attempts": attempts,
+                "n_obs": n_obs,
+                "error": None if error is None else f"{type(error).__name__}: {error}",
+            }
+
+        prices = pd.DataFrame(columns).sort_index() if columns else pd.DataFrame()
+        status = pd.DataFrame.from_dict(rows, orient="index").reindex(tickers)
+        return prices, status
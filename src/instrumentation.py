@@ -0,0 +1,239 @@
+# src/instrumentation.py
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+import pandas as pd
+
+logger = logging.getLogger("equity_dashboard.profile")
+
+_NULL_STAGE = nullcontext()
+
+# tracemalloc is process-wide: it is started for the first profiler that
+# wants it and stopped after the last one lets go, unless someone else
+# (e.g. PYTHONTRACEMALLOC) had started it first
+_TRACE_LOCK = threading.Lock()
+_trace_users = 0
+_trace_owned = False
+
+
+def _acquire_tracing():
+    global _trace_users, _trace_owned
+    with _TRACE_LOCK:
+        if _trace_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _trace_owned = True
+        _trace_users += 1
+
+
+def _release_tracing():
+    global _trace_users, _trace_owned
+    with _TRACE_LOCK:
+        _trace_users -= 1
+        if _trace_users == 0 and _trace_owned:
+            tracemalloc.stop()
+            _trace_owned = False
+
+
+class Profiler:
+    """
+    Per-stage wall time, call count and tracemalloc peak.
+
+    Disabled by default: ``stage`` then returns a shared no-op context and
+    ``profiled`` functions call straight through after one attribute
+    check, so the hooks can stay in production code.
+
+    Stages nest. A stage's peak is the highest traced allocation above
+    what was live when it started, children included. tracemalloc is
+    process-wide, so stages running concurrently in other threads are
+    counted too; timings are unaffected. Disabling a profiler never stops
+    tracing another profiler still relies on.
+    """
+
+    def __init__(self, enabled=False, trace_memory=True):
+        self.enabled = False
+        self.trace_memory = trace_memory
+        self._tracing = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+        if enabled:
+            self.enable(trace_memory)
+
+    # -------------------------------------------------------
+    # Switching
+    # -------------------------------------------------------
+    def enable(self, trace_memory=None):
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+        if self.trace_memory and not self._tracing:
+            _acquire_tracing()
+            self._tracing = True
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._tracing:
+            _release_tracing()
+            self._tracing = False
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+            self._events = []
+
+    # -------------------------------------------------------
+    # Hooks
+    # -------------------------------------------------------
+    def stage(self, name):
+        """Context manager timing the enclosed block as ``name``."""
+        if not self.enabled:
+            return _NULL_STAGE
+        return self._measure(name)
+
+    @contextmanager
+    def _measure(self, name):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+
+        tracing = self.trace_memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # Bank the parent's peak so far before resetting the counter
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frame = {"start": current, "peak": current}
+        else:
+            frame = None
+        stack.append(frame)
+
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            stack.pop()
+            peak_bytes = None
+            if frame is not None:
+                absolute = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                peak_bytes = absolute - frame["start"]
+                if stack and stack[-1] is not None:
+                    stack[-1]["peak"] = max(stack[-1]["peak"], absolute)
+            self._record(name, elapsed, peak_bytes, depth=len(stack))
+
+    def _record(self, name, elapsed, peak_bytes, depth):
+        peak_mb = None if peak_bytes is None else peak_bytes / 1024 ** 2
+        with self._lock:
+            s = self._stats.get(name)
+            if s is None:
+                s = self._stats[name] = {
+                    "calls": 0, "total_s": 0.0, "max_s": 0.0, "last_s": 0.0,
+                    "peak_mb": None,
+                }
+            s["calls"] += 1
+            s["total_s"] += elapsed
+            s["max_s"] = max(s["max_s"], elapsed)
+            s["last_s"] = elapsed
+            if peak_mb is not None:
+                s["peak_mb"] = max(s["peak_mb"] or 0.0, peak_mb)
+            event = {
+                "stage": name,
+                "seconds": elapsed,
+                "peak_mb": peak_mb,
+                "depth": depth,
+                "ts": time.time(),
+            }
+            self._events.append(event)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(event))
+
+    # -------------------------------------------------------
+    # Reporting
+    # -------------------------------------------------------
+    def report(self) -> pd.DataFrame:
+        """One row per stage, slowest (total) first."""
+        with self._lock:
+            stats = {k: dict(v) for k, v in self._stats.items()}
+        columns = ["calls", "total_s", "mean_s", "max_s", "last_s", "peak_mb"]
+        if not stats:
+            return pd.DataFrame(columns=columns).rename_axis("stage")
+        frame = pd.DataFrame.from_dict(stats, orient="index").rename_axis("stage")
+        frame["mean_s"] = frame["total_s"] / frame["calls"]
+        return frame[columns].sort_values("total_s", ascending=False)
+
+    def events(self) -> list:
+        with self._lock:
+            return list(self._events)
+
+    def to_json(self, **kwargs) -> str:
+        """Summary and raw events as a JSON document."""
+        with self._lock:
+            payload = {
+                "stages": {k: dict(v) for k, v in self._stats.items()},
+                "events": list(self._events),
+            }
+        return json.dumps(payload, **kwargs)
+
+
+PROFILER = Profiler(enabled=os.environ.get("DASHBOARD_PROFILE", "0") == "1")
+
+# Profiler of the current context (e.g. one Streamlit session) if set
+_ACTIVE = ContextVar("equity_dashboard_profiler", default=None)
+
+
+def current_profiler() -> Profiler:
+    """The profiler set for this context, else the global ``PROFILER``."""
+    return _ACTIVE.get() or PROFILER
+
+
+def set_profiler(profiler):
+    """
+    Route ``stage``/``profiled`` in the current context (thread or task)
+    to ``profiler``; None restores the global one. Returns a token for
+    ``ContextVar.reset``. Work handed to other threads is not covered.
+    """
+    return _ACTIVE.set(profiler)
+
+
+@contextmanager
+def use_profiler(profiler):
+    """``set_profiler`` for the duration of a ``with`` block."""
+    token = _ACTIVE.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _ACTIVE.reset(token)
+
+
+def stage(name):
+    """``with stage("fetch"): ...`` on the current profiler."""
+    return current_profiler().stage(name)
+
+
+def profiled(func=None, *, name=None):
+    """
+    Decorator recording every call of ``func`` as a stage named
+    ``module.function`` (or ``name``) on the current profiler.
+    """
+    if func is None:
+        return functools.partial(profiled, name=name)
+
+    label = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        profiler = _ACTIVE.get() or PROFILER
+        if not profiler.enabled:
+            return func(*args, **kwargs)
+        with profiler._measure(label):
+            return func(*args, **kwargs)
+
+    return wrapper
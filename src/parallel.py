@@ -0,0 +1,72 @@
+# src/parallel.py
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def seed_sequence(seed=None) -> np.random.SeedSequence:
+    """
+    Normalize a seed (int, SeedSequence, Generator or None) into a
+    SeedSequence from which independent child streams can be spawned.
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(int(seed.integers(2 ** 63)))
+    return np.random.SeedSequence(seed)
+
+
+def spawn_seeds(seed, n):
+    """
+    Spawn ``n`` independent child SeedSequences, one per work chunk.
+
+    Chunk ``k`` always receives child ``k``, so results depend only on the
+    seed and the chunk layout, never on how chunks are scheduled.
+    """
+    return seed_sequence(seed).spawn(n)
+
+
+def resolve_n_jobs(n_jobs):
+    """Translate ``n_jobs`` (None, positive int, or -1 for all cores)."""
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + n_jobs)
+    return max(1, int(n_jobs))
+
+
+def run_tasks(func, tasks, n_jobs=1, executor=None):
+    """
+    Evaluate ``func(*task)`` for every task and return results in task
+    order.
+
+    Parameters
+    ----------
+    func : callable
+        Module-level function (must be picklable for process pools)
+    tasks : list of tuple
+        Positional arguments for each call
+    n_jobs : int or None
+        Worker processes to start when no executor is given;
+        1 runs serially in-process, -1 uses all cores
+    executor : concurrent.futures.Executor or None
+        Existing pool to submit to; it is not shut down afterwards
+
+    Returns
+    -------
+    list of results, ordered like ``tasks``
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return []
+
+    if executor is not None:
+        return list(executor.map(func, *zip(*tasks)))
+
+    workers = min(resolve_n_jobs(n_jobs), len(tasks))
+    if workers == 1:
+        return [func(*task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, *zip(*tasks)))
@@ -0,0 +1,360 @@
+# src/precompute.py
+"""
+Nightly precompute job for the dashboard's single-asset views.
+
+    python -m src.precompute --n-jobs 8    # e.g. from cron shortly after midnight
+
+For every ticker in the universe, the dashboard's own analytics are run
+on the date range the dashboard requests by default that day
+(``default_range``) and stored in a ``PrecomputeStore``:
+
+- rolling bootstrap CIs of the mean for each of ``STANDARD_WINDOWS``
+- rolling mean/std for those windows (Sharpe series for any rate)
+- volatility-regime mean/std (regime Sharpe for any rate)
+- the ``fit_return_distribution`` summary
+
+Each entry records a content hash of the prices it was built from, so the
+dashboard serves it only when its own prices hash the same: a stored
+result is then exactly what it would have computed. Tickers whose prices
+did not change since the last run are not recomputed.
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.analysis import _regime_labels, compute_returns, portfolio_returns, regime_sharpe_panel
+from src.bootstrap import rolling_bootstrap_ci
+from src.cache import hash_inputs
+from src.distributions import fit_return_distribution
+from src.parallel import resolve_n_jobs
+from src.universe import AVAILABLE_TICKERS, open_panel
+
+DEFAULT_PRECOMPUTE_DIR = os.path.join("~", ".cache", "equity-dashboard", "precompute")
+
+# Superseded pickles stay this long for sessions still reading them
+ORPHAN_GRACE = timedelta(minutes=10)
+
+# Dashboard defaults the stored views are built for
+STANDARD_WINDOWS = (63, 126, 252)
+LOOKBACK_DAYS = 365 * 3
+N_BOOT = 800
+BOOT_SEED = 12345
+
+
+def default_range(as_of=None):
+    """The dashboard's default ``(start, end)`` dates on day ``as_of``."""
+    end = pd.Timestamp(as_of).date() if as_of is not None else date.today()
+    return end - timedelta(days=LOOKBACK_DAYS), end
+
+
+# -----------------------------------------------------------
+# 1. ANALYTICS
+# -----------------------------------------------------------
+def single_asset_analytics(prices, windows=STANDARD_WINDOWS, n_boot=N_BOOT, seed=BOOT_SEED) -> dict:
+    """
+    Rate-independent analytics of a one-column price frame, computed with
+    the same calls and arguments as the dashboard.
+    """
+    port_ret = portfolio_returns(compute_returns(prices), pd.Series(1.0, index=prices.columns))
+
+    regime = pd.DataFrame(np.nan, index=_regime_labels(3), columns=["n_obs", "mean", "std"])
+    # Same guard as regime_conditioned_sharpe
+    if port_ret.rolling(21).std().dropna().nunique() >= 3:
+        panel = regime_sharpe_panel(port_ret.to_frame(), vol_window=21, n_regimes=3, moments=True)
+        for field in regime.columns:
+            regime[field] = panel[field].iloc[0].to_numpy()
+
+    return {
+        "rolling_ci": {
+            w: rolling_bootstrap_ci(port_ret, window=w, n_boot=n_boot, seed=seed) for w in windows
+        },
+        "rolling_stats": {
+            w: pd.DataFrame({"mean": port_ret.rolling(w).mean(), "std": port_ret.rolling(w).std()})
+            for w in windows
+        },
+        "regime": regime,
+        "distribution": fit_return_distribution(port_ret),
+    }
+
+
+def sharpe_from_stats(stats: pd.DataFrame, rf_rate: float) -> pd.Series:
+    """Annualized Sharpe from daily ``mean``/``std`` columns."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (stats["mean"] - rf_rate / 252) / stats["std"] * np.sqrt(252)
+
+
+# -----------------------------------------------------------
+# 2. STORE
+# -----------------------------------------------------------
+class PrecomputeStore:
+    """
+    Precomputed single-asset analytics, one pickle per (ticker, range)
+    entry, indexed by ``index.json``.
+
+    The index records per entry what it was built from (input hash, last
+    price date, seed, replicates, windows) and when: ``computed_at`` for
+    the last rebuild and ``checked_at`` for the last run that found its
+    prices unchanged. ``freshness`` reports both.
+
+    Pickles are named after what they were built from and never
+    rewritten: a rebuild writes a new file and then swaps the index, so a
+    reader holding the file name from ``lookup`` always gets the artifacts
+    it matched. Superseded files are removed by ``prune`` after
+    ``ORPHAN_GRACE``.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.expanduser(str(root))
+        os.makedirs(self.root, exist_ok=True)
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+
+    # -------------------------------------------------------
+    # Index
+    # -------------------------------------------------------
+    @staticmethod
+    def key(ticker, start, end) -> str:
+        return f"{ticker}|{pd.Timestamp(start).date()}|{pd.Timestamp(end).date()}"
+
+    def _index_path(self):
+        return os.path.join(self.root, "index.json")
+
+    def index(self) -> dict:
+        try:
+            with open(self._index_path()) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _write_index(self, index):
+        path = self._index_path()
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as fh:
+            json.dump(index, fh, indent=1)
+        os.replace(tmp, path)
+
+    def freshness(self) -> pd.DataFrame:
+        """One row per entry: ticker, range, data_end, computed_at, checked_at, age_hours."""
+        index = self.index()
+        columns = ["ticker", "start", "end", "data_end", "computed_at", "checked_at"]
+        frame = pd.DataFrame.from_dict(index, orient="index").reindex(columns=columns)
+        checked = pd.to_datetime(frame["checked_at"], utc=True)
+        frame["age_hours"] = (pd.Timestamp.now(tz="UTC") - checked).dt.total_seconds() / 3600
+        return frame
+
+    # -------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------
+    def lookup(self, ticker, start, end, prices, seed=BOOT_SEED):
+        """
+        Entry (its pickle's file name) for ``ticker`` over ``[start, end)``
+        if it was built from exactly ``prices`` with ``seed``, else None.
+        """
+        meta = self.index().get(self.key(ticker, start, end))
+        if meta is None or meta["seed"] != seed or meta["input_hash"] != hash_inputs(prices):
+            return None
+        return meta["file"]
+
+    def meta(self, entry) -> dict:
+        """Index record of ``entry``, or None once a rebuild superseded it."""
+        return next((m for m in self.index().values() if m["file"] == entry), None)
+
+    def load(self, entry) -> dict:
+        """Artifacts of ``entry`` (the last few stay in memory)."""
+        with self._lock:
+            if entry in self._loaded:
+                self._loaded.move_to_end(entry)
+                return self._loaded[entry]
+        with open(os.path.join(self.root, entry), "rb") as fh:
+            artifacts = pickle.load(fh)
+        with self._lock:
+            self._loaded[entry] = artifacts
+            while len(self._loaded) > 8:
+                self._loaded.popitem(last=False)
+        return artifacts
+
+    # -------------------------------------------------------
+    # Writes (one writer: the precompute job)
+    # -------------------------------------------------------
+    def put(self, ticker, start, end, prices, artifacts, seed, n_boot, windows):
+        key = self.key(ticker, start, end)
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        input_hash = hash_inputs(prices)
+        built_from = hash_inputs(input_hash, seed, n_boot, list(windows))
+        file = f"{hash_inputs(key)[:12]}-{built_from[:12]}.pkl"
+        path = os.path.join(self.root, file)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "wb") as fh:
+            pickle.dump(artifacts, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+        index = self.index()
+        previous = index.get(key, {}).get("file")
+        index[key] = {
+            "ticker": ticker,
+            "start": str(pd.Timestamp(start).date()),
+            "end": str(pd.Timestamp(end).date()),
+            "data_end": str(prices.index[-1].date()),
+            "input_hash": input_hash,
+            "seed": seed,
+            "n_boot": n_boot,
+            "windows": list(windows),
+            "computed_at": now,
+            "checked_at": now,
+            "file": file,
+        }
+        self._write_index(index)
+        if previous not in (None, file):
+            self._orphan(previous)
+
+    def _orphan(self, file):
+        # Start the grace period now rather than at the file's build time
+        try:
+            os.utime(os.path.join(self.root, file))
+        except FileNotFoundError:
+            pass
+
+    def touch(self, keys):
+        """Mark entries as checked now without rebuilding them."""
+        index = self.index()
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        for key in keys:
+            index[key]["checked_at"] = now
+        self._write_index(index)
+
+    def prune(self, before):
+        """
+        Drop entries whose range ended before ``before``, and pickles no
+        entry has referenced for ``ORPHAN_GRACE``.
+        """
+        index = self.index()
+        cutoff = pd.Timestamp(before)
+        for key in [k for k, m in index.items() if pd.Timestamp(m["end"]) < cutoff]:
+            self._orphan(index.pop(key)["file"])
+        self._write_index(index)
+
+        live = {m["file"] for m in index.values()}
+        expiry = time.time() - ORPHAN_GRACE.total_seconds()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name.endswith(".pkl") and name not in live and os.path.getmtime(path) < expiry:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+def default_precompute_store() -> PrecomputeStore:
+    """Store rooted at ``$PRECOMPUTE_DIR`` (or the user cache dir)."""
+    return PrecomputeStore(os.environ.get("PRECOMPUTE_DIR", DEFAULT_PRECOMPUTE_DIR))
+
+
+# -----------------------------------------------------------
+# 3. JOB
+# -----------------------------------------------------------
+def _load_single_prices(tickers, start, end) -> dict:
+    """``{ticker: one-column closes}`` as the dashboard would load them."""
+    panel = open_panel()
+    if panel is not None and panel.covers(tickers, start, end):
+        frames = {t: panel.prices([t], start, end) for t in tickers}
+    else:
+        from src.data_fetch import fetch_prices
+
+        prices = fetch_prices(tickers, start, end)
+        frames = {
+            t: prices[[t]].dropna(how="all") for t in tickers if t in prices.columns
+        }
+    return {t: f for t, f in frames.items() if len(f) > 1}
+
+
+def run(
+    tickers=AVAILABLE_TICKERS,
+    as_of=None,
+    windows=STANDARD_WINDOWS,
+    n_boot=N_BOOT,
+    seed=BOOT_SEED,
+    n_jobs=1,
+    store=None,
+    force=False,
+    keep_days=7,
+) -> dict:
+    """Refresh the store for ``as_of`` (today by default); returns run statistics."""
+    t0 = time.perf_counter()
+    store = store or default_precompute_store()
+    start, end = default_range(as_of)
+    prices = _load_single_prices(list(tickers), start, end)
+
+    index = store.index()
+    todo, unchanged = [], []
+    for ticker, frame in prices.items():
+        meta = index.get(store.key(ticker, start, end))
+        if (
+            not force and meta is not None
+            and meta["input_hash"] == hash_inputs(frame)
+            and (meta["seed"], meta["n_boot"], meta["windows"]) == (seed, n_boot, list(windows))
+        ):
+            unchanged.append(store.key(ticker, start, end))
+        else:
+            todo.append(ticker)
+    if unchanged:
+        store.touch(unchanged)
+
+    stats = {"computed": 0, "failed": len(tickers) - len(prices)}
+    n_jobs = resolve_n_jobs(n_jobs)
+
+    def save(ticker, compute):
+        try:
+            artifacts = compute()
+        except Exception as e:  # one bad ticker must not stop the job
+            print(f"{ticker}: {e}", file=sys.stderr)
+            stats["failed"] += 1
+            return
+        store.put(ticker, start, end, prices[ticker], artifacts, seed, n_boot, windows)
+        stats["computed"] += 1
+
+    if n_jobs == 1:
+        for ticker in todo:
+            save(ticker, lambda: single_asset_analytics(prices[ticker], windows, n_boot, seed))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = {
+                pool.submit(single_asset_analytics, prices[t], windows, n_boot, seed): t
+                for t in todo
+            }
+            for future in as_completed(futures):
+                save(futures[future], future.result)
+
+    store.prune(end - timedelta(days=keep_days))
+    return {
+        "as_of": str(end),
+        **stats,
+        "unchanged": len(unchanged),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute single-asset dashboard analytics.")
+    parser.add_argument("--as-of", help="day the dashboard will serve (default today)")
+    parser.add_argument("--windows", type=int, nargs="+", default=list(STANDARD_WINDOWS))
+    parser.add_argument("--n-jobs", type=int, default=1, help="worker processes (-1 = all cores)")
+    parser.add_argument("--force", action="store_true", help="rebuild unchanged entries too")
+    args = parser.parse_args(argv)
+
+    stats = run(as_of=args.as_of, windows=tuple(args.windows), n_jobs=args.n_jobs, force=args.force)
+    print(json.dumps(stats), file=sys.stderr)
+    return 1 if stats["failed"] and not (stats["computed"] or stats["unchanged"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# src/price_store.py
+import json
+import os
+import threading
+from datetime import date
+
+import pandas as pd
+
+DEFAULT_STORE_DIR = os.path.join("~", ".cache", "equity-dashboard", "prices")
+
+
+def _to_date(value) -> date:
+    return pd.Timestamp(value).date()
+
+
+# Streamlit sessions are threads of one process and may each open their
+# own PriceStore, so appends are serialized per file, not per instance
+_LOCKS = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def _file_lock(path) -> threading.Lock:
+    with _LOCKS_GUARD:
+        return _LOCKS.setdefault(path, threading.Lock())
+
+
+class PriceStore:
+    """
+    Persistent per-ticker close-price store.
+
+    Each ticker lives in ``<root>/<TICKER>.parquet`` next to a small JSON
+    sidecar recording the contiguous date range, ``[start, end)``, that has
+    already been requested from the provider. Callers ask for the ranges
+    that are still missing, fetch only those, and append them.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.expanduser(str(root))
+        os.makedirs(self.root, exist_ok=True)
+
+    # -------------------------------------------------------
+    # Paths & metadata
+    # -------------------------------------------------------
+    def _path(self, ticker, ext):
+        safe = ticker.replace(os.sep, "_").replace("^", "_")
+        return os.path.join(self.root, f"{safe}.{ext}")
+
+    def coverage(self, ticker):
+        """Return the covered ``(start, end)`` dates, or None."""
+        try:
+            with open(self._path(ticker, "json")) as fh:
+                meta = json.load(fh)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return _to_date(meta["start"]), _to_date(meta["end"])
+
+    def missing_ranges(self, ticker, start, end):
+        """
+        Date ranges ``[(start, end), ...]`` (end exclusive) that must be
+        fetched to cover the request: a head and/or a tail. A request that
+        lies entirely beyond the coverage also pulls in the gap, so the
+        covered range stays contiguous.
+        """
+        start, end = _to_date(start), _to_date(end)
+        cov = self.coverage(ticker)
+        if cov is None:
+            return [(start, end)] if start < end else []
+
+        cov_start, cov_end = cov
+        ranges = []
+        if start < cov_start:
+            ranges.append((start, cov_start))
+        if end > cov_end:
+            ranges.append((cov_end, end))
+        return ranges
+
+    # -------------------------------------------------------
+    # Read / write
+    # -------------------------------------------------------
+    def read(self, ticker, start=None, end=None) -> pd.Series:
+        """Stored closes for ``ticker`` in ``[start, end)``."""
+        try:
+            frame = pd.read_parquet(self._path(ticker, "parquet"))
+        except FileNotFoundError:
+            return pd.Series(dtype=float, name=ticker)
+
+        series = frame["close"].rename(ticker)
+        if start is not None:
+            series = series[series.index >= pd.Timestamp(start)]
+        if end is not None:
+            series = series[series.index < pd.Timestamp(end)]
+        return series
+
+    def append(self, ticker, prices: pd.Series, start, end):
+        """
+        Merge newly fetched closes for ``[start, end)`` into the store and
+        extend the covered range. The range should touch the existing
+        coverage (a missing head or tail), so coverage stays contiguous.
+
+        Today's bar is still moving, so coverage never extends past
+        today; the next request refetches it. A download without a single
+        close (failed, throttled, not yet published) leaves the store
+        untouched, so the range is requested again next time.
+
+        Returns True if the range was recorded.
+        """
+        start, end = _to_date(start), _to_date(end)
+        end = min(end, date.today())
+
+        new = prices.dropna().astype(float)
+        if new.empty:
+            return False
+        new.index = pd.DatetimeIndex(new.index).tz_localize(None)
+
+        # Read-merge-replace under the ticker's lock so concurrent appends
+        # cannot drop each other's rows
+        with _file_lock(self._path(ticker, "parquet")):
+            existing = self.read(ticker)
+            merged = pd.concat([existing[~existing.index.isin(new.index)], new])
+            merged = merged.sort_index()
+
+            cov = self.coverage(ticker)
+            if cov is not None:
+                start, end = min(start, cov[0]), max(end, cov[1])
+
+            # Data first, then coverage: a crash in between only causes a refetch
+            suffix = f"tmp-{os.getpid()}-{threading.get_ident()}"
+            path = self._path(ticker, "parquet")
+            merged.to_frame("close").to_parquet(f"{path}.{suffix}")
+            os.replace(f"{path}.{suffix}", path)
+
+            path = self._path(ticker, "json")
+            with open(f"{path}.{suffix}", "w") as fh:
+                json.dump({"start": start.isoformat(), "end": end.isoformat()}, fh)
+            os.replace(f"{path}.{suffix}", path)
+        return True
+
+
+def default_store() -> PriceStore:
+    """Store rooted at ``$PRICE_STORE_DIR`` (or the user cache dir)."""
+    return PriceStore(os.environ.get("PRICE_STORE_DIR", DEFAULT_STORE_DIR))
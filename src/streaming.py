@@ -0,0 +1,373 @@
+# src/streaming.py
+import os
+import pickle
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from src.analysis import _regime_labels, compute_returns, portfolio_returns
+from src.distributions import fit_student_t
+from src.instrumentation import profiled
+from src.parallel import seed_sequence
+
+
+class StreamingAnalytics:
+    """
+    Incrementally updated portfolio analytics for append-only price feeds.
+
+    Seed it from history with ``from_history`` and then feed new bars to
+    ``update``; nothing is recomputed over the full history. Per bar:
+
+    - rolling Sharpe and rolling skew/kurtosis/Jarque-Bera come from a
+      ring buffer of the last ``window`` returns, O(window), with the
+      definitions of ``rolling_sharpe`` and ``rolling_moment_diagnostics``
+    - volatility-regime Sharpe ratios keep every (volatility, return)
+      pair sorted by volatility with per-regime sums. A new pair moves the
+      quantile cut-points by about one rank, so only the few pairs between
+      the old and new cut-points change regime: O(log n) search plus a
+      list insert. Cut-points and bins are those of ``regime_sharpe_panel``
+    - the bootstrap CI of the rolling mean is the online Poisson bootstrap
+      of ``rolling_bootstrap_ci(mode="poisson")``, O(n_boot)
+    - full-history moments for the distribution summary are running power
+      sums, O(1); the Student-t fit is refreshed on demand from the last
+      estimate
+
+    ``checkpoint`` / ``restore`` persist the whole state, including the
+    random generator, so a restarted process resumes where it stopped.
+    """
+
+    def __init__(
+        self,
+        weights=None,
+        rf_rate=0.0,
+        window=126,
+        vol_window=21,
+        n_regimes=3,
+        n_boot=800,
+        alpha=0.05,
+        seed=None,
+        min_obs=5,
+    ):
+        self.weights = None if weights is None else pd.Series(weights, dtype=float)
+        self.rf_rate = float(rf_rate)
+        self.window = int(window)
+        self.vol_window = int(vol_window)
+        self.n_regimes = int(n_regimes)
+        self.n_boot = int(n_boot)
+        self.alpha = float(alpha)
+        self.min_obs = int(min_obs)
+        self._rng = np.random.default_rng(seed_sequence(seed))
+
+        self.last_date = None
+        self._last_prices = None
+        self._returns = []
+        self._dates = []
+
+        # Ring buffers (position = number of returns seen modulo size)
+        self._ring = np.full(self.window, np.nan)
+        self._vol_ring = np.full(self.vol_window, np.nan)
+
+        # Poisson bootstrap state for the current window
+        self._w_buf = np.zeros((self.window, self.n_boot))
+        self._sum_w = np.zeros(self.n_boot)
+        self._sum_wx = np.zeros(self.n_boot)
+
+        # Regimes: pairs sorted by volatility, per-regime sums of centred returns
+        self._center = 0.0
+        self._vols = []
+        self._ys = []
+        self._edges = np.full(self.n_regimes - 1, np.nan)
+        self._regime = np.zeros((self.n_regimes, 3))  # count, sum y, sum y^2
+
+        # Full-history power sums of centred returns
+        self._power = np.zeros(5)
+        self._t_fit = None
+
+    # -------------------------------------------------------
+    # Seeding
+    # -------------------------------------------------------
+    @classmethod
+    def from_history(cls, prices: pd.DataFrame, **kwargs):
+        """Build the state from a prices history in one vectorized pass."""
+        self = cls(**kwargs)
+        if isinstance(prices, pd.Series):
+            prices = prices.to_frame()
+        if self.weights is None:
+            self.weights = pd.Series(1.0 / prices.shape[1], index=prices.columns)
+
+        port = portfolio_returns(compute_returns(prices), self.weights)
+        x = port.to_numpy(dtype=float)
+        self._returns = x.tolist()
+        self._dates = list(port.index)
+        self._last_prices = prices[self.weights.index].ffill().iloc[-1].to_numpy(dtype=float)
+        self.last_date = prices.index[-1]
+        n = len(x)
+
+        self._center = float(x.mean()) if n else 0.0
+        y = x - self._center
+        self._power = np.array([n, y.sum(), (y ** 2).sum(), (y ** 3).sum(), (y ** 4).sum()])
+
+        # Ring buffers hold the tail in arrival order: slot = index % size
+        for size, ring in ((self.window, self._ring), (self.vol_window, self._vol_ring)):
+            tail = np.arange(max(0, n - size), n)
+            ring[tail % size] = x[tail]
+
+        # Regime pairs: rolling vol as in regime_sharpe_panel
+        vol = port.rolling(self.vol_window).std().to_numpy()
+        usable = ~np.isnan(vol)
+        order = np.argsort(vol[usable], kind="stable")
+        self._vols = vol[usable][order].tolist()
+        self._ys = y[usable][order].tolist()
+        self._edges = self._quantile_edges()
+        self._rebuild_regimes()
+
+        # Poisson weights for the observations currently in the window
+        tail = np.arange(max(0, n - self.window), n)
+        weights = self._rng.poisson(1.0, size=(len(tail), self.n_boot))
+        self._w_buf[tail % self.window] = weights
+        self._sum_w = weights.sum(axis=0).astype(float)
+        self._sum_wx = x[tail] @ weights
+        return self
+
+    # -------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------
+    @profiled
+    def update(self, new_prices) -> dict:
+        """
+        Append one or more bars (a DataFrame, or a Series of closes named
+        by its date) and return the latest ``snapshot``. Bars dated on or
+        before the last processed bar are ignored, so refreshes can resend
+        overlapping data.
+        """
+        if self._last_prices is None:
+            raise RuntimeError("Seed the state with from_history() first.")
+        if isinstance(new_prices, pd.Series):
+            new_prices = new_prices.to_frame().T
+        new_prices = new_prices.sort_index()
+        new_prices = new_prices[new_prices.index > self.last_date]
+
+        w = self.weights.to_numpy()
+        w = w / w.sum()
+        for date, row in new_prices[self.weights.index].iterrows():
+            prices = row.to_numpy(dtype=float)
+            asset_ret = prices / self._last_prices - 1.0
+            # A missing close leaves the last valid one in place, as
+            # compute_returns does
+            self._last_prices = np.where(np.isfinite(prices), prices, self._last_prices)
+            self.last_date = date
+            port = float(asset_ret @ w)
+            if np.isfinite(port):
+                self._push(port, date)
+        return self.snapshot()
+
+    def _push(self, x, date):
+        n = len(self._returns)
+        self._returns.append(x)
+        self._dates.append(date)
+
+        # Full-history power sums
+        y = x - self._center
+        self._power += np.array([1.0, y, y ** 2, y ** 3, y ** 4])
+
+        # Rolling window and the Poisson bootstrap that follows it
+        slot = n % self.window
+        if n >= self.window:
+            old = self._ring[slot]
+            self._sum_w -= self._w_buf[slot]
+            self._sum_wx -= self._w_buf[slot] * old
+        w_new = self._rng.poisson(1.0, size=self.n_boot)
+        self._sum_w += w_new
+        self._sum_wx += w_new * x
+        self._w_buf[slot] = w_new
+        self._ring[slot] = x
+        if slot == self.window - 1 and n + 1 >= self.window:
+            # Rebuild the running sums once per window to stop round-off drift
+            self._sum_w = self._w_buf.sum(axis=0)
+            self._sum_wx = self._ring @ self._w_buf
+
+        # Volatility regimes
+        self._vol_ring[n % self.vol_window] = x
+        if n + 1 >= self.vol_window:
+            self._insert_regime_pair(float(np.std(self._vol_ring, ddof=1)), y)
+
+    # -------------------------------------------------------
+    # Regime bookkeeping
+    # -------------------------------------------------------
+    def _quantile_edges(self):
+        """Inner quantile edges of the sorted vols (np.quantile, linear)."""
+        n = len(self._vols)
+        if n == 0:
+            return np.full(self.n_regimes - 1, np.nan)
+        pos = np.linspace(0, 1, self.n_regimes + 1)[1:-1] * (n - 1)
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, n - 1)
+        v = self._vols
+        return np.array([
+            v[a] + (p - a) * (v[b] - v[a]) for p, a, b in zip(pos, lo, hi)
+        ])
+
+    def _bucket(self, vol, edges):
+        # Right-closed bins, as (V > edges).sum() in regime_sharpe_panel
+        return int((vol > edges).sum())
+
+    def _rebuild_regimes(self):
+        self._regime[:] = 0.0
+        if not self._vols:
+            return
+        vols = np.asarray(self._vols)
+        ys = np.asarray(self._ys)
+        bucket = (vols[:, None] > self._edges[None, :]).sum(axis=1)
+        self._regime[:, 0] = np.bincount(bucket, minlength=self.n_regimes)
+        self._regime[:, 1] = np.bincount(bucket, weights=ys, minlength=self.n_regimes)
+        self._regime[:, 2] = np.bincount(bucket, weights=ys * ys, minlength=self.n_regimes)
+
+    def _insert_regime_pair(self, vol, y):
+        pos = bisect_right(self._vols, vol)
+        self._vols.insert(pos, vol)
+        self._ys.insert(pos, y)
+
+        old_edges = self._edges
+        new_edges = self._quantile_edges()
+        self._edges = new_edges
+
+        # Only pairs between an old and a new cut-point can change regime
+        moved = set()
+        for a, b in zip(old_edges, new_edges):
+            if not np.isfinite(a):
+                continue
+            lo, hi = min(a, b), max(a, b)
+            moved.update(range(bisect_right(self._vols, lo), bisect_right(self._vols, hi)))
+        moved.discard(pos)
+
+        if not np.isfinite(old_edges).all():
+            self._rebuild_regimes()
+            return
+        for i in moved:
+            v, yi = self._vols[i], self._ys[i]
+            before, after = self._bucket(v, old_edges), self._bucket(v, new_edges)
+            if before != after:
+                self._regime[before] -= (1.0, yi, yi * yi)
+                self._regime[after] += (1.0, yi, yi * yi)
+        self._regime[self._bucket(vol, new_edges)] += (1.0, y, y * y)
+
+    # -------------------------------------------------------
+    # Outputs
+    # -------------------------------------------------------
+    def rolling_metrics(self) -> dict:
+        """Sharpe, moments and bootstrap CI of the latest full window."""
+        out = dict.fromkeys(
+            ["rolling_sharpe", "mean", "lower", "upper", "skew", "kurtosis", "jb_stat", "jb_p"],
+            np.nan,
+        )
+        if len(self._returns) < self.window:
+            return out
+
+        x = self._ring
+        excess = x - self.rf_rate / 252
+        sd = excess.std(ddof=1)
+        if sd > 0:
+            out["rolling_sharpe"] = excess.mean() / sd * np.sqrt(252)
+
+        d = x - x.mean()
+        m2 = (d ** 2).mean()
+        if m2 > 0:
+            skew = (d ** 3).mean() / m2 ** 1.5
+            kurt = (d ** 4).mean() / m2 ** 2 - 3.0
+            jb = self.window / 6.0 * (skew ** 2 + kurt ** 2 / 4.0)
+            out.update(skew=skew, kurtosis=kurt, jb_stat=jb, jb_p=stats.chi2.sf(jb, 2))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = np.where(self._sum_w > 0, self._sum_wx / self._sum_w, np.nan)
+        out["mean"] = x.mean()
+        out["lower"], out["upper"] = np.nanpercentile(
+            means, [100 * self.alpha / 2, 100 * (1 - self.alpha / 2)]
+        )
+        return out
+
+    def regime_sharpe(self) -> pd.Series:
+        """Annualized Sharpe per volatility regime over the full history."""
+        cnt, s1, s2 = self._regime.T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = s1 / cnt
+            var = (s2 - s1 * mean) / (cnt - 1)
+            sharpe = (mean + self._center - self.rf_rate / 252) / np.sqrt(var) * np.sqrt(252)
+        sharpe = np.where((cnt >= self.min_obs) & (var > 0), sharpe, np.nan)
+        return pd.Series(sharpe, index=_regime_labels(self.n_regimes))
+
+    def distribution(self, fit_t=False) -> dict:
+        """
+        Full-history normal moments and Jarque-Bera test from the running
+        power sums (definitions of ``fit_return_distribution``). With
+        ``fit_t`` the Student-t fit is refreshed, warm-started from the
+        previous estimate.
+        """
+        n, s1, s2, s3, s4 = self._power
+        out = {"n_obs": int(n)}
+        if n < 30:
+            out["status"] = "insufficient_data"
+            return out
+
+        m = s1 / n
+        m2 = s2 / n - m ** 2
+        m3 = s3 / n - 3 * m * s2 / n + 2 * m ** 3
+        m4 = s4 / n - 4 * m * s3 / n + 6 * m ** 2 * s2 / n - 3 * m ** 4
+        skew = m3 / m2 ** 1.5
+        kurt = m4 / m2 ** 2 - 3.0
+        jb = n / 6.0 * (skew ** 2 + kurt ** 2 / 4.0)
+        out["normal"] = {
+            "mu": float(m + self._center),
+            "sigma": float(np.sqrt(m2)),
+            "skew": float(skew),
+            "kurtosis": float(kurt),
+        }
+        out["jarque_bera_p"] = float(stats.chi2.sf(jb, 2))
+
+        if fit_t:
+            init = None
+            if self._t_fit is not None:
+                init = (self._t_fit["df"], self._t_fit["loc"], self._t_fit["scale"])
+            self._t_fit = fit_student_t(np.asarray(self._returns), init=init)
+        if self._t_fit is not None:
+            out["student_t"] = {k: self._t_fit[k] for k in ("df", "loc", "scale", "n_iter", "converged")}
+        return out
+
+    def snapshot(self) -> dict:
+        """Latest rolling metrics, regime Sharpe and cut-points."""
+        return {
+            "date": self._dates[-1] if self._dates else None,
+            "n_obs": len(self._returns),
+            **self.rolling_metrics(),
+            "regime_sharpe": self.regime_sharpe(),
+            "regime_edges": self._edges.copy(),
+        }
+
+    def returns(self) -> pd.Series:
+        """Every portfolio return seen so far."""
+        return pd.Series(self._returns, index=pd.Index(self._dates), name="Portfolio")
+
+    # -------------------------------------------------------
+    # Persistence
+    # -------------------------------------------------------
+    def checkpoint(self, path):
+        """Write the full state to ``path`` atomically."""
+        state = dict(self.__dict__)
+        state["_rng"] = self._rng.bit_generator.state
+        tmp = f"{path}.tmp-{os.getpid()}"
+        with open(tmp, "wb") as fh:
+            pickle.dump(state, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def restore(cls, path):
+        """Load a state written by ``checkpoint``."""
+        with open(path, "rb") as fh:
+            state = pickle.load(fh)
+        self = cls.__new__(cls)
+        rng_state = state.pop("_rng")
+        self.__dict__.update(state)
+        self._rng = np.random.default_rng()
+        self._rng.bit_generator.state = rng_state
+        return self
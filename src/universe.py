@@ -0,0 +1,264 @@
+# src/universe.py
+"""
+Dashboard ticker universe and its shared, memory-mapped price panel.
+
+    python -m src.universe --start 2015-01-01   # fetch and publish
+
+A published panel is a version directory of column-major ``.npy`` files
+(one contiguous column per ticker) plus a small JSON index of tickers,
+dates and the covered range. A ``CURRENT`` pointer names the live
+version; publishing writes a new version next to it and swaps the
+pointer atomically, so readers never see a half-written panel. Every
+Streamlit session and worker process maps the same files read-only, so
+the OS page cache holds one copy of the history however many readers
+there are.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from src.cache import hash_inputs
+
+DEFAULT_PANEL_DIR = os.path.join("~", ".cache", "equity-dashboard", "panel")
+
+AVAILABLE_TICKERS = sorted([
+    # --- BIG TECH (Magnificent 7 & Semi) ---
+    "AAPL", "MSFT", "GOOGL", "AMZN", "META", "NVDA", "TSLA", "AVGO", "AMD", "INTC", "QCOM", "ADBE", "CRM", "NFLX",
+
+    # --- FINANCE & PAYMENTS ---
+    "JPM", "BAC", "WFC", "GS", "MS", "V", "MA", "PYPL", "AXP", "BLK", "BRK-B",
+
+    # --- HEALTHCARE & BIO ---
+    "LLY", "UNH", "JNJ", "PFE", "ABBV", "MRK", "AMGN", "ISRG", "TMO",
+
+    # --- CONSUMER & RETAIL ---
+    "WMT", "COST", "PG", "KO", "PEP", "NKE", "SBUX", "MCD", "DIS", "HD", "LOW",
+
+    # --- ENERGY & INDUSTRIALS ---
+    "XOM", "CVX", "CAT", "BA", "GE", "UNP", "HON", "RTX",
+
+    # --- REAL ESTATE / REITS (Useful for your metro project) ---
+    "PLD", "AMT", "EQIX", "O", "WELL", "PSA", "SPG", "VICI", "DLR",
+
+    # --- ETFS & INDICES ---
+    "SPY", "QQQ", "VOO", "IVV", "IWM", "DIA", "VTI", "VUG", "SCHD", "ARKK", "TLT", "GLD",
+
+    # --- CRYPTO (Yahoo Finance Format) ---
+    "BTC-USD", "ETH-USD", "SOL-USD"
+])
+
+
+# -----------------------------------------------------------
+# 1. READER
+# -----------------------------------------------------------
+class SharedPanel:
+    """
+    Read-only view of one published panel version.
+
+    ``prices`` and ``returns`` hand out DataFrames whose columns are views
+    into the mapped files; rows are only copied (for the selected columns)
+    when all-NaN dates must be dropped, e.g. weekends when stocks are
+    selected from a panel that also holds crypto. Pickling an instance
+    pickles just its path, so worker processes map the same version.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "index.json")) as fh:
+            meta = json.load(fh)
+        self.version = meta["version"]
+        self.start = pd.Timestamp(meta["start"])
+        self.end = pd.Timestamp(meta["end"])
+        self.tickers = meta["tickers"]
+        self.dates = pd.DatetimeIndex(np.load(os.path.join(path, "dates.npy")))
+        self._prices = np.load(os.path.join(path, "prices.npy"), mmap_mode="r")
+        self._returns = np.load(os.path.join(path, "returns.npy"), mmap_mode="r")
+        self._col = {t: i for i, t in enumerate(meta["columns"])}
+
+    def __reduce__(self):
+        return type(self), (self.path,)
+
+    def __repr__(self):
+        # Names the version, so cache keys built from a panel are stable
+        return f"SharedPanel({self.path!r})"
+
+    def covers(self, tickers, start, end) -> bool:
+        """True if the panel was built for all ``tickers`` over ``[start, end)``."""
+        return (
+            set(tickers) <= set(self.tickers)
+            and self.start <= pd.Timestamp(start)
+            and pd.Timestamp(end) <= self.end
+        )
+
+    def _frame(self, data, tickers, start, end):
+        i0, i1 = self.dates.searchsorted([pd.Timestamp(start), pd.Timestamp(end)])
+        cols = [t for t in tickers if t in self._col]
+        frame = pd.DataFrame(
+            {t: data[i0:i1, self._col[t]] for t in cols},
+            index=self.dates[i0:i1], columns=cols, copy=False,
+        )
+        keep = np.zeros(i1 - i0, dtype=bool)
+        for t in cols:
+            keep |= ~np.isnan(self._prices[i0:i1, self._col[t]])
+        return frame, keep
+
+    def prices(self, tickers, start, end) -> pd.DataFrame:
+        """Closes for ``[start, end)``, cleaned like ``fetch_prices``."""
+        frame, keep = self._frame(self._prices, tickers, start, end)
+        if not keep.all():
+            frame = frame[keep]
+        return frame.dropna(axis=1, how="all")
+
+    def returns(self, tickers, start, end) -> pd.DataFrame:
+        """
+        Same values as ``compute_returns(self.prices(tickers, start, end))``.
+
+        The stored returns run on each ticker's own trading calendar; they
+        are served directly when the selected tickers trade on the same
+        dates in the range, and recomputed from the price slice otherwise.
+        """
+        from src.analysis import compute_returns
+
+        prices = self.prices(tickers, start, end)
+        if prices.isna().to_numpy().any():
+            return compute_returns(prices)
+        frame, keep = self._frame(self._returns, list(prices.columns), start, end)
+        if not keep.all():
+            frame = frame[keep]
+        return frame.iloc[1:]
+
+
+_OPEN = {}
+
+
+def panel_dir() -> str:
+    """Panel root: ``$PANEL_DIR`` or the user cache dir."""
+    return os.path.expanduser(os.environ.get("PANEL_DIR", DEFAULT_PANEL_DIR))
+
+
+def current_version(root=None):
+    """Version named by the ``CURRENT`` pointer, or None."""
+    try:
+        with open(os.path.join(root or panel_dir(), "CURRENT")) as fh:
+            return json.load(fh)["version"]
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def open_panel(root=None):
+    """
+    The live panel under ``root``, or None if nothing was published.
+
+    Mappings are kept per process and reused until the pointer moves to
+    a new version, so calling this on every rerun costs one small read.
+    """
+    root = root or panel_dir()
+    version = current_version(root)
+    if version is None:
+        return None
+    key = (root, version)
+    if key not in _OPEN:
+        # Earlier versions stay mapped for callers still holding them
+        _OPEN.clear()
+        _OPEN[key] = SharedPanel(os.path.join(root, version))
+    return _OPEN[key]
+
+
+# -----------------------------------------------------------
+# 2. WRITER
+# -----------------------------------------------------------
+def publish_panel(prices: pd.DataFrame, start, end, tickers=None, root=None, keep=2) -> str:
+    """
+    Publish ``prices`` (dates x tickers) as the new live panel.
+
+    Parameters
+    ----------
+    prices : pd.DataFrame
+        Closes as returned by ``fetch_prices(tickers, start, end)``
+    start, end : date-like
+        Range the panel was built for, ``[start, end)``
+    tickers : list or None
+        Tickers that were requested (defaults to the columns); requested
+        tickers without data are recorded so sessions do not refetch them
+    root : str or None
+        Panel root (``panel_dir()`` if None)
+    keep : int
+        Published versions to keep on disk; older ones are removed (open
+        mappings stay valid on POSIX systems)
+
+    Returns
+    -------
+    The live version. Identical content republishes nothing.
+    """
+    root = root or panel_dir()
+    os.makedirs(root, exist_ok=True)
+    prices = prices.sort_index().astype(float)
+    tickers = sorted(tickers if tickers is not None else prices.columns)
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+
+    digest = hash_inputs(prices, tickers, str(start), str(end))[:12]
+    live = current_version(root)
+    if live is not None and live.endswith(digest):
+        return live
+    version = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{digest}"
+
+    # Returns on each ticker's own calendar (previous valid close)
+    returns = pd.DataFrame(
+        {t: prices[t].dropna().pct_change() for t in prices.columns},
+        index=prices.index, columns=prices.columns,
+    )
+
+    tmp = os.path.join(root, f".{version}.tmp-{os.getpid()}")
+    os.makedirs(tmp)
+    np.save(os.path.join(tmp, "prices.npy"), np.asfortranarray(prices.to_numpy()))
+    np.save(os.path.join(tmp, "returns.npy"), np.asfortranarray(returns.to_numpy()))
+    np.save(os.path.join(tmp, "dates.npy"), pd.DatetimeIndex(prices.index).to_numpy())
+    with open(os.path.join(tmp, "index.json"), "w") as fh:
+        json.dump({
+            "version": version,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "tickers": tickers,
+            "columns": list(prices.columns),
+        }, fh)
+    os.replace(tmp, os.path.join(root, version))
+
+    pointer = os.path.join(root, "CURRENT")
+    with open(f"{pointer}.tmp-{os.getpid()}", "w") as fh:
+        json.dump({"version": version}, fh)
+    os.replace(f"{pointer}.tmp-{os.getpid()}", pointer)
+
+    versions = sorted(d for d in os.listdir(root) if not d.startswith(".") and d != "CURRENT"
+                      and os.path.isdir(os.path.join(root, d)))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return version
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch the dashboard universe and publish the shared panel.")
+    parser.add_argument("--start", default=str(pd.Timestamp.today().normalize() - pd.DateOffset(years=10))[:10])
+    parser.add_argument("--end", default=str(pd.Timestamp.today().normalize() + pd.Timedelta(days=1))[:10])
+    parser.add_argument("--root", help="panel directory (default $PANEL_DIR or the user cache dir)")
+    args = parser.parse_args(argv)
+
+    from src.data_fetch import fetch_prices
+
+    prices = fetch_prices(AVAILABLE_TICKERS, args.start, args.end)
+    if prices.empty:
+        print("No prices fetched; panel left unchanged.", file=sys.stderr)
+        return 1
+    version = publish_panel(prices, args.start, args.end, AVAILABLE_TICKERS, args.root)
+    print(json.dumps({"version": version, "tickers": prices.shape[1], "dates": len(prices)}),
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,41 +1,290 @@
 # src/visualization.py
+import numpy as np
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from scipy import stats
 
-def animated_ci_band(ci_df):
+from src.instrumentation import profiled
+
+# -----------------------------------------------------------
+# RENDERING BUDGET
+# -----------------------------------------------------------
+# Traces longer than this are drawn with WebGL (Scattergl) instead of SVG
+WEBGL_THRESHOLD = 1000
+
+# Upper bound on the serialized (JSON) size of one line chart. Traces are
+# decimated to a per-trace point budget derived from it, and the chart is
+# rebuilt with fewer points if the payload still exceeds it (down to
+# MIN_POINTS per trace, below which the chart is returned as is).
+MAX_FIGURE_BYTES = 400_000
+BYTES_PER_POINT = 50  # ISO timestamp + float in plotly JSON, conservatively
+MIN_POINTS = 100
+
+
+def figure_payload_bytes(fig) -> int:
+    """Size of the JSON payload that is shipped to the browser."""
+    return len(fig.to_json())
+
+
+def point_budget(n_traces, max_bytes=MAX_FIGURE_BYTES):
+    """Points each of ``n_traces`` line traces may keep within the cap."""
+    return max(MIN_POINTS, int(max_bytes // (BYTES_PER_POINT * max(n_traces, 1))))
+
+
+def _within_cap(build, max_points, max_bytes=MAX_FIGURE_BYTES):
+    """
+    ``build(max_points)``, rebuilt with proportionally fewer points while
+    its payload exceeds ``max_bytes``.
+    """
+    fig = build(max_points)
+    size = figure_payload_bytes(fig)
+    while size > max_bytes and max_points > MIN_POINTS:
+        max_points = max(MIN_POINTS, min(max_points - 1, int(0.9 * max_points * max_bytes / size)))
+        fig = build(max_points)
+        size = figure_payload_bytes(fig)
+    return fig
+
+
+def _scatter(n_points, **kwargs):
+    trace = go.Scattergl if n_points > WEBGL_THRESHOLD else go.Scatter
+    return trace(**kwargs)
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling (Steinarsson, 2013).
+
+    Returns the indices of ``n_out`` points (first and last always kept)
+    that best preserve the visual shape of the line ``(x, y)``.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    xf, yf = _as_float(x), np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            nxt = slice(edges[i + 1], edges[i + 2])
+            avg_x, avg_y = xf[nxt].mean(), yf[nxt].mean()
+        else:
+            avg_x, avg_y = xf[-1], yf[-1]
+        area = np.abs(
+            (xf[a] - avg_x) * (yf[lo:hi] - yf[a])
+            - (xf[a] - xf[lo:hi]) * (avg_y - yf[a])
+        )
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+
+def minmax_envelope(lower, upper, n_buckets):
+    """
+    Bucket a band into ``n_buckets`` and keep, per bucket, the minimum of
+    ``lower`` and the maximum of ``upper`` so no excursion is lost.
+
+    Returns ``(positions, lower, upper)``; ``positions`` are the bucket
+    start indices (the final point is appended).
+    """
+    n = len(lower)
+    if n_buckets >= n:
+        return np.arange(n), np.asarray(lower), np.asarray(upper)
+    starts = np.linspace(0, n, n_buckets, endpoint=False).astype(int)
+    lo = np.minimum.reduceat(np.asarray(lower, dtype=float), starts)
+    hi = np.maximum.reduceat(np.asarray(upper, dtype=float), starts)
+    pos = np.append(starts, n - 1)
+    return pos, np.append(lo, lower[-1]), np.append(hi, upper[-1])
+
+
+@profiled
+def animated_ci_band(ci_df, max_points=None):
     """
     Animated rolling CI band for mean returns.
+
+    Long histories are decimated server-side: the band keeps the min/max
+    envelope of each bucket and the mean line is LTTB-downsampled, with
+    fewer points if needed to keep the payload under ``MAX_FIGURE_BYTES``.
+    """
+    ci_df = ci_df.dropna()
+    dates = ci_df.index.values
+
+    def build(max_points):
+        pos, lower, upper = minmax_envelope(
+            ci_df["lower"].values, ci_df["upper"].values, max_points
+        )
+        keep = lttb_indices(dates, ci_df["mean"].values, max_points)
+
+        fig = go.Figure()
+
+        fig.add_trace(_scatter(
+            len(pos),
+            x=dates[pos],
+            y=upper,
+            line=dict(width=0),
+            showlegend=False,
+            hoverinfo="skip"
+        ))
+
+        fig.add_trace(_scatter(
+            len(pos),
+            x=dates[pos],
+            y=lower,
+            fill="tonexty",
+            fillcolor="rgba(0, 100, 255, 0.2)",
+            line=dict(width=0),
+            name="95% CI"
+        ))
+
+        fig.add_trace(_scatter(
+            len(keep),
+            x=dates[keep],
+            y=ci_df["mean"].values[keep],
+            line=dict(color="blue", width=2),
+            name="Rolling Mean"
+        ))
+
+        fig.update_layout(
+            title="Rolling Mean Return with Bootstrap CI",
+            xaxis_title="Date",
+            yaxis_title="Mean Return",
+            height=450
+        )
+
+        return fig
+
+    return _within_cap(build, max_points or point_budget(3))
+
+
+@profiled
+def rolling_sharpe_chart(rolling_sh, max_points=None):
+    """Rolling portfolio Sharpe line, LTTB-decimated for long histories."""
+    rolling_sh = rolling_sh.dropna()
+
+    def build(max_points):
+        keep = lttb_indices(rolling_sh.index.values, rolling_sh.values, max_points)
+        fig = go.Figure()
+        fig.add_trace(_scatter(
+            len(keep),
+            x=rolling_sh.index.values[keep],
+            y=rolling_sh.values[keep],
+            mode="lines",
+            name="Rolling Sharpe"
+        ))
+        fig.update_layout(title="Rolling Portfolio Sharpe")
+        return fig
+
+    return _within_cap(build, max_points or point_budget(1))
+
+
+@profiled
+def return_distribution_chart(returns, dist_stats, nbins=60):
+    """
+    Empirical return density with normal and Student-t fits.
+
+    The histogram is binned server-side with ``np.histogram`` and sent as
+    bar heights, so the payload is ``nbins`` values rather than every
+    observation.
     """
+    hist_x = returns.dropna().values
+    density, edges = np.histogram(hist_x, bins=nbins, density=True)
+    centers = 0.5 * (edges[:-1] + edges[1:])
+
+    x_grid = np.linspace(
+        np.quantile(hist_x, 0.001),
+        np.quantile(hist_x, 0.999),
+        400
+    )
+
     fig = go.Figure()
 
-    fig.add_trace(go.Scatter(
-        x=ci_df.index,
-        y=ci_df["upper"],
-        line=dict(width=0),
-        showlegend=False,
-        hoverinfo="skip"
+    # Histogram (pre-binned)
+    fig.add_trace(go.Bar(
+        x=centers,
+        y=density,
+        width=np.diff(edges),
+        name="Empirical",
+        opacity=0.6
     ))
 
+    # Normal fit
+    normal = dist_stats["normal"]
     fig.add_trace(go.Scatter(
-        x=ci_df.index,
-        y=ci_df["lower"],
-        fill="tonexty",
-        fillcolor="rgba(0, 100, 255, 0.2)",
-        line=dict(width=0),
-        name="95% CI"
+        x=x_grid,
+        y=stats.norm.pdf(x_grid, normal["mu"], normal["sigma"]),
+        name="Normal Fit",
+        line=dict(dash="dash")
     ))
 
-    fig.add_trace(go.Scatter(
-        x=ci_df.index,
-        y=ci_df["mean"],
-        line=dict(color="blue", width=2),
-        name="Rolling Mean"
-    ))
+    # Student-t fit
+    t_fit = dist_stats["student_t"]
+    if isinstance(t_fit, dict):
+        fig.add_trace(go.Scatter(
+            x=x_grid,
+            y=stats.t.pdf(x_grid, t_fit["df"], t_fit["loc"], t_fit["scale"]),
+            name="Student-t Fit"
+        ))
 
     fig.update_layout(
-        title="Rolling Mean Return with Bootstrap CI",
-        xaxis_title="Date",
-        yaxis_title="Mean Return",
-        height=450
+        title="Return Distribution: Empirical vs Fitted",
+        xaxis_title="Daily Return",
+        yaxis_title="Density",
+        bargap=0.02
     )
 
     return fig
+
+
+@profiled
+def rolling_diagnostics_chart(diag_df):
+    """
+    Rolling skewness, excess kurtosis and Jarque-Bera p-value, stacked
+    on a shared date axis (each line LTTB-decimated).
+    """
+    def build(max_points):
+        fig = make_subplots(
+            rows=3, cols=1, shared_xaxes=True, vertical_spacing=0.06,
+            subplot_titles=("Skewness", "Excess Kurtosis", "Jarque-Bera p-value")
+        )
+
+        styles = [
+            ("skew", "purple", "Skew"),
+            ("kurtosis", "darkorange", "Excess Kurtosis"),
+            ("jb_p", "firebrick", "JB p-value"),
+        ]
+        for row, (col, color, name) in enumerate(styles, start=1):
+            series = diag_df[col].dropna()
+            keep = lttb_indices(series.index.values, series.values, max_points)
+            fig.add_trace(_scatter(
+                len(keep),
+                x=series.index.values[keep], y=series.values[keep],
+                line=dict(color=color, width=1.5), name=name
+            ), row=row, col=1)
+
+        # Reference lines: normal skew/kurtosis and the 5% significance level
+        fig.add_hline(y=0, line=dict(dash="dot", color="gray"), row=1, col=1)
+        fig.add_hline(y=0, line=dict(dash="dot", color="gray"), row=2, col=1)
+        fig.add_hline(y=0.05, line=dict(dash="dot", color="gray"), row=3, col=1)
+        fig.update_yaxes(type="log", row=3, col=1)
+
+        fig.update_layout(
+            title="Rolling Distribution Diagnostics",
+            xaxis3_title="Date",
+            showlegend=False,
+            height=650
+        )
+
+        return fig
+
+    return _within_cap(build, point_budget(3))
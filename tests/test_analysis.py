@@ -0,0 +1,153 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis import batch_portfolio_metrics, compute_returns, rolling_sharpe
+
+
+@pytest.fixture(scope="module")
+def returns():
+    rng = np.random.default_rng(0)
+    values = rng.normal(0.0005, 0.01, (1500, 5))
+    return pd.DataFrame(values, index=pd.bdate_range("2015-01-01", periods=1500), columns=list("abcde"))
+
+
+@pytest.fixture(scope="module")
+def weights():
+    return np.random.default_rng(1).random((30, 5))
+
+
+def test_batch_bootstrap_stays_within_budget(returns, weights):
+    budget = 2 * 1024 ** 2  # the counts matrix alone needs 24 MB
+    full = batch_portfolio_metrics(returns, weights, window=63, n_boot=2000, seed=7)
+
+    tracemalloc.start()
+    try:
+        small = batch_portfolio_metrics(
+            returns, weights, window=63, n_boot=2000, seed=7, max_chunk_bytes=budget
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert peak < 2 * budget
+    # Streaming the counts redraws exactly the same resamples
+    pd.testing.assert_frame_equal(small["summary"], full["summary"], rtol=1e-12)
+    pd.testing.assert_frame_equal(small["rolling_sharpe"], full["rolling_sharpe"])
+
+
+def test_float32_returns_within_documented_tolerance(returns):
+    prices = 100 * (1 + returns).cumprod()
+    full = compute_returns(prices)
+    compact = compute_returns(prices, dtype=np.float32)
+
+    assert (compact.dtypes == np.float32).all()
+    np.testing.assert_allclose(compact.to_numpy(), full.to_numpy(), rtol=6e-8, atol=0)
+    pd.testing.assert_frame_equal(
+        rolling_sharpe(compact, 0.02, 126), rolling_sharpe(full, 0.02, 126),
+        check_dtype=False, rtol=0, atol=1e-6,
+    )
+
+
+def test_sharpe_surface_matches_pandas_rolling(returns):
+    from src.analysis import rolling_sharpe_surface
+
+    port = returns["a"].copy()
+    port.iloc[700:705] = np.nan  # windows over a gap are NaN in both
+    windows = [10, 21, 63, 126, 252]
+    surface = rolling_sharpe_surface(port, 0.03, windows)
+    for w in windows:
+        expected = rolling_sharpe(port, 0.03, w)
+        pd.testing.assert_series_equal(surface[w], expected, check_names=False, rtol=1e-9, atol=1e-12)
+
+
+def _regime_sharpe_loop(returns, rf_rate, vol_window, n_regimes):
+    """The per-asset, per-regime loop regime_sharpe_panel replaced."""
+    vol = returns.rolling(vol_window).std().dropna()
+    regimes = pd.qcut(vol, q=n_regimes, labels=False, duplicates="drop")
+    aligned = returns.loc[vol.index]
+    out = []
+    for regime in range(n_regimes):
+        r = aligned[regimes == regime]
+        if r.std() == 0 or len(r) < 5:
+            out.append(np.nan)
+        else:
+            out.append((r.mean() - rf_rate / 252) / r.std() * np.sqrt(252))
+    return np.array(out)
+
+
+@pytest.mark.parametrize("n_regimes", [3, 5])
+def test_regime_sharpe_panel_matches_per_regime_loop(returns, n_regimes):
+    from src.analysis import regime_sharpe_panel
+
+    panel = regime_sharpe_panel(returns, rf_rate=0.02, vol_window=21, n_regimes=n_regimes)
+    for asset in returns.columns:
+        expected = _regime_sharpe_loop(returns[asset], 0.02, 21, n_regimes)
+        np.testing.assert_allclose(panel["sharpe"].loc[asset].to_numpy(), expected, rtol=1e-12)
+
+
+def test_log_trends_match_compute_log_trend():
+    from src.analysis import compute_log_trend, expanding_log_trend, panel_log_trend, rolling_log_trend
+
+    rng = np.random.default_rng(1)
+    index = pd.bdate_range("2015-01-01", periods=600)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(rng.normal(0.0004, 0.015, (600, 3)), axis=0)),
+        index=index, columns=["a", "b", "c"],
+    )
+    window = 126
+    rolling = rolling_log_trend(prices, window)
+    expanding = expanding_log_trend(prices)
+    panel = panel_log_trend(prices)
+
+    assert rolling.iloc[:window - 1].isna().all().all()
+    for t in range(window - 1, len(prices), 7):
+        for col in prices.columns:
+            trailing = compute_log_trend(prices[col].iloc[t - window + 1:t + 1]).iloc[-1]
+            grown = compute_log_trend(prices[col].iloc[:t + 1]).iloc[-1]
+            assert rolling[col].iloc[t] == pytest.approx(trailing, rel=1e-9)
+            assert expanding[col].iloc[t] == pytest.approx(grown, rel=1e-9)
+    for col in prices.columns:
+        full = compute_log_trend(prices[col])
+        np.testing.assert_allclose(panel[col], full, rtol=1e-9)
+        assert expanding[col].iloc[-1] == pytest.approx(full.iloc[-1], rel=1e-9)
+
+
+@pytest.mark.parametrize("tails", ["normal", "fat"])
+def test_portfolio_moment_metrics_match_portfolio_returns(returns, weights, tails):
+    from scipy import stats
+
+    from src.analysis import moment_summary, portfolio_moment_metrics, portfolio_returns
+    from src.distributions import fit_return_distribution
+
+    # Normal returns keep the JB p-value informative; fat tails drive it to ~0
+    panel = returns.copy()
+    if tails == "fat":
+        panel *= np.random.default_rng(2).standard_t(4, returns.shape) / 2
+    panel.iloc[100:110, 2] = np.nan  # incomplete rows are dropped by both paths
+    summary = moment_summary(panel)
+
+    for w in weights[:5]:
+        w = pd.Series(w, index=panel.columns)
+        metrics = portfolio_moment_metrics(summary, w, rf_rate=0.02)
+        port = portfolio_returns(panel, w)
+        dist = fit_return_distribution(port)
+
+        assert metrics["n_obs"] == len(port) == len(panel) - 10
+        expected = {
+            "mean": port.mean(),
+            "vol": port.std() * np.sqrt(252),
+            "sharpe": (port.mean() - 0.02 / 252) / port.std() * np.sqrt(252),
+            "sigma": port.std(ddof=0),
+            "skew": stats.skew(port),
+            "kurtosis": stats.kurtosis(port),
+            "jarque_bera_p": stats.jarque_bera(port).pvalue,
+        }
+        for key, value in expected.items():
+            assert metrics[key] == pytest.approx(value, rel=1e-9), key
+        assert metrics["skew"] == pytest.approx(dist["normal"]["skew"], rel=1e-9)
+        assert metrics["jarque_bera_p"] == pytest.approx(dist["jarque_bera_p"], rel=1e-9)
+        if tails == "normal":
+            assert metrics["jarque_bera_p"] > 1e-3
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import batch
+
+
+@pytest.fixture
+def config(tmp_path):
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2020-01-01", periods=300)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(0.01 * rng.standard_normal((300, 3)), axis=0)),
+        index=index, columns=["AAA", "BBB", "CCC"],
+    )
+    prices.to_csv(tmp_path / "prices.csv")
+    config = {
+        "start": "2020-01-01",
+        "end": str(index[250].date()),  # exclusive
+        "window": 63,
+        "n_boot": 100,
+        "prices_file": str(tmp_path / "prices.csv"),
+        "output": str(tmp_path / "out" / "summary.csv"),
+        "timeseries_output": str(tmp_path / "out" / "rolling.parquet"),
+        "portfolios": [
+            {"name": "pair", "holdings": {"AAA": 10, "BBB": 5}},
+            {"name": "all", "holdings": {"AAA": 1, "BBB": 1, "CCC": 1}},
+            {"name": "missing", "holdings": {"AAA": 1, "ZZZ": 1}},
+        ],
+    }
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps(config))
+    return batch.load_config(str(path))
+
+
+def test_run_writes_summary_timeseries_and_progress(config, capsys):
+    stats = batch.run(config)
+
+    assert stats["portfolios"] == 3 and stats["failed"] == 1
+    summary = pd.read_csv(config["output"]).set_index("portfolio")
+    assert list(summary.columns) == batch.SUMMARY_COLUMNS[1:]
+    assert summary.loc["missing", "status"].startswith("error: no prices for ['ZZZ']")
+    ok = summary.loc[["pair", "all"]]
+    assert (ok["status"] == "ok").all()
+    # 250 closes in [start, end) give 249 returns; the end date is excluded
+    assert (ok["n_obs"] == 249).all()
+    assert ok[["sharpe", "ci_lower_last", "ci_upper_last", "t_df"]].notna().all().all()
+
+    rolling = pd.read_parquet(config["timeseries_output"])
+    assert sorted(rolling["portfolio"].unique()) == ["all", "pair"]
+    assert (rolling.groupby("portfolio")["date"].max() < pd.Timestamp(config["end"])).all()
+    assert len(rolling) == 2 * 249
+
+    lines = capsys.readouterr().err.splitlines()
+    assert lines[-1].startswith("[3/3] ") and "1 failed" in lines[-1]
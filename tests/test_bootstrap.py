@@ -0,0 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.bootstrap import bootstrap_sharpe, buffer_bytes, rolling_bootstrap_ci
+
+WINDOW = 126
+N_BOOT = 1000
+
+
+@pytest.fixture(scope="module")
+def returns():
+    # Fat-tailed daily returns, about 1% volatility
+    rng = np.random.default_rng(0)
+    values = 0.01 * rng.standard_t(4, 400) / np.sqrt(2)
+    return pd.Series(values, index=pd.bdate_range("2020-01-01", periods=400))
+
+
+@pytest.fixture(scope="module")
+def exact_runs(returns):
+    return [
+        rolling_bootstrap_ci(returns, window=WINDOW, n_boot=N_BOOT, seed=seed)
+        for seed in (1, 2)
+    ]
+
+
+def test_poisson_matches_exact_within_monte_carlo_error(returns, exact_runs):
+    exact, exact_other = exact_runs
+    poisson = rolling_bootstrap_ci(returns, window=WINDOW, n_boot=N_BOOT, mode="poisson", seed=1)
+
+    assert poisson.index.equals(exact.index)
+    np.testing.assert_array_equal(poisson["mean"], exact["mean"])
+
+    width = (exact["upper"] - exact["lower"]).mean()
+    for col in ("lower", "upper"):
+        gap = (poisson[col] - exact[col]).abs()
+        seed_gap = (exact_other[col] - exact[col]).abs().mean()
+        # Endpoints agree to Monte Carlo error: a few percent of the CI
+        # width, and no worse than two exact runs with different seeds
+        assert gap.mean() < 0.05 * width
+        assert gap.max() < 0.15 * width
+        assert gap.mean() < 1.5 * seed_gap
+
+    # Poisson replicate variance is inflated by only ~1 + 1/window
+    poisson_width = (poisson["upper"] - poisson["lower"]).mean()
+    assert abs(poisson_width / width - 1) < 0.03
+
+
+@pytest.mark.parametrize("mode", ["exact", "poisson"])
+def test_float32_rolling_ci_matches_float64(returns, exact_runs, mode):
+    full = exact_runs[0] if mode == "exact" else rolling_bootstrap_ci(
+        returns, window=WINDOW, n_boot=N_BOOT, mode=mode, seed=1
+    )
+    compact = rolling_bootstrap_ci(
+        returns, window=WINDOW, n_boot=N_BOOT, mode=mode, seed=1, dtype=np.float32
+    )
+    pd.testing.assert_frame_equal(compact, full, rtol=0, atol=1e-6)
+    assert buffer_bytes(WINDOW, N_BOOT, mode, np.float32)["saved"] > 0
+
+
+def test_float32_bootstrap_sharpe_matches_float64(returns):
+    full = bootstrap_sharpe(returns, n_boot=2000, seed=3)
+    compact = bootstrap_sharpe(returns, n_boot=2000, seed=3, dtype=np.float32)
+    for key in ("mean", "lower", "upper"):
+        assert compact[key] == pytest.approx(full[key], abs=1e-6)
+
+
+@pytest.fixture(scope="module")
+def thread_pool():
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        yield pool
+
+
+@pytest.mark.parametrize("method", ["iid", "stationary", "moving_block"])
+@pytest.mark.parametrize("runner", ["n_jobs=2", "executor"])
+def test_results_do_not_depend_on_parallelism(returns, thread_pool, method, runner):
+    parallel = {"n_jobs": 2} if runner == "n_jobs=2" else {"executor": thread_pool}
+    series = returns.iloc[:300]
+
+    # Three resample chunks
+    serial = bootstrap_sharpe(series, n_boot=1500, seed=11, method=method, block_length=5)
+    other = bootstrap_sharpe(series, n_boot=1500, seed=11, method=method, block_length=5, **parallel)
+    assert other == serial
+
+    # Two date blocks
+    serial = rolling_bootstrap_ci(returns, window=63, n_boot=200, seed=11, method=method, block_length=5)
+    other = rolling_bootstrap_ci(
+        returns, window=63, n_boot=200, seed=11, method=method, block_length=5, **parallel
+    )
+    pd.testing.assert_frame_equal(other, serial, check_exact=True)
+
+
+@pytest.mark.parametrize("n_obs, block_length", [(126, 5.0), (500, 20.0)])
+def test_stationary_blocks_have_geometric_lengths(n_obs, block_length):
+    from src.bootstrap import _resample_indices
+
+    idx = _resample_indices(np.random.default_rng(0), n_obs, 4000, "stationary", block_length)
+
+    assert idx.min() >= 0 and idx.max() < n_obs
+    # A block continues (wrapping around the end) except where a new one starts
+    starts = (np.diff(idx, axis=1) % n_obs) != 1
+    p = 1.0 / block_length
+    assert abs(starts.mean() - p * (1 - 1 / n_obs)) < 4 * np.sqrt(p / starts.size)
+    # The first block starts uniformly on the sample
+    assert abs(idx[:, 0].mean() / (n_obs - 1) - 0.5) < 4 * np.sqrt(1 / 12 / len(idx))
+
+
+@pytest.mark.parametrize("method", ["iid", "stationary", "moving_block"])
+def test_adaptive_replicates_are_a_prefix_of_bootstrap_distribution(returns, monkeypatch, method):
+    from src import bootstrap
+
+    drawn = []
+    chunk = bootstrap._bootstrap_chunk
+
+    def recording_chunk(*args):
+        drawn.append(chunk(*args))
+        return drawn[-1]
+
+    monkeypatch.setattr(bootstrap, "_bootstrap_chunk", recording_chunk)
+    bootstrap.adaptive_bootstrap_ci(
+        returns, tol=0.0, min_boot=1, max_boot=1500, seed=3, method=method, block_length=5
+    )
+    replicates = np.concatenate(drawn)
+
+    assert len(replicates) == 1500
+    for n_boot in (100, bootstrap.BOOT_CHUNK, 700, 1500):
+        expected = bootstrap.bootstrap_distribution(
+            returns, n_boot=n_boot, seed=3, method=method, block_length=5
+        )
+        np.testing.assert_array_equal(replicates[:n_boot], expected)
+
+
+def test_adaptive_stops_at_first_chunk_within_tolerance(returns):
+    from src.bootstrap import _percentile_mc_se, adaptive_bootstrap_ci, bootstrap_distribution
+
+    budget = returns.size * 8 * 100  # 100 replicates per chunk
+    kwargs = dict(seed=3, max_chunk_bytes=budget)
+    q = (0.025, 0.975)
+
+    def check(n_boot):
+        boot = np.sort(bootstrap_distribution(returns, n_boot=n_boot, **kwargs))
+        lower, upper = np.quantile(boot, q)
+        mc_se = max(_percentile_mc_se(boot, q[0]), _percentile_mc_se(boot, q[1]))
+        return lower, upper, mc_se, mc_se <= 0.02 * (upper - lower)
+
+    result = adaptive_bootstrap_ci(returns, tol=0.02, min_boot=400, analytic="never", **kwargs)
+
+    assert result["path"] == "bootstrap" and result["converged"]
+    assert result["n_boot"] % 100 == 0 and result["n_boot"] > 400
+    lower, upper, mc_se, ok = check(result["n_boot"])
+    assert ok
+    assert (result["lower"], result["upper"], result["mc_se"]) == (lower, upper, mc_se)
+    assert not any(check(n)[3] for n in range(400, result["n_boot"], 100))
+
+    capped = adaptive_bootstrap_ci(returns, tol=0.001, max_boot=600, analytic="never", **kwargs)
+    assert capped["n_boot"] == 600 and not capped["converged"]
+    assert capped["mc_se"] > 0.001 * (capped["upper"] - capped["lower"])
+
+
+def test_adaptive_path_selection(returns):
+    from src.bootstrap import adaptive_bootstrap_ci, analytic_ci
+
+    values = np.tile(returns.to_numpy(), 2)  # 800 observations
+    result = adaptive_bootstrap_ci(values, statistic="sharpe", rf=0.0001, analytic_min_obs=500)
+    expected = analytic_ci(values, "sharpe", rf=0.0001)
+    assert result["path"] == "analytic" and result["n_boot"] == 0 and result["converged"]
+    assert (result["lower"], result["upper"]) == (expected["lower"], expected["upper"])
+
+    for kwargs in (
+        dict(analytic_min_obs=1000),  # too short
+        dict(method="stationary", block_length=5),  # dependence needs resampling
+        dict(statistic="vol"),  # no asymptotic formula
+        dict(analytic="never"),
+    ):
+        result = adaptive_bootstrap_ci(values, seed=0, **kwargs)
+        assert result["path"] == "bootstrap" and result["n_boot"] >= 400, kwargs
+
+    assert adaptive_bootstrap_ci(values[:50], analytic="always")["path"] == "analytic"
+    with pytest.raises(ValueError):
+        adaptive_bootstrap_ci(values, statistic="vol", analytic="always")
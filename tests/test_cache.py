@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cache import ResultCache, cached
+from src.pipeline import Pipeline
+
+
+@pytest.fixture(params=[False, True], ids=["memory", "disk"])
+def cache(request, tmp_path):
+    return ResultCache(disk_dir=tmp_path if request.param else None)
+
+
+def test_hits_cannot_corrupt_the_cache(cache):
+    calls = []
+
+    @cached(cache=cache)
+    def stats(values, seed=0):
+        calls.append(seed)
+        return {"frame": pd.DataFrame({"x": values}), "array": np.asarray(values), "tags": ["a"]}
+
+    first = stats([1.0, 2.0])
+    first["frame"].iloc[0, 0] = 99.0
+    first["array"][0] = 99.0
+    first["tags"].append("b")
+    if cache.disk_dir:
+        cache.clear()  # serve the next hit from disk
+
+    hit = stats([1.0, 2.0])
+    hit["frame"].iloc[0, 0] = -1.0
+    with pytest.raises(ValueError):
+        hit["array"][0] = -1.0
+    hit["tags"].append("c")
+
+    again = stats([1.0, 2.0])
+    assert len(calls) == 1
+    assert again["frame"]["x"].tolist() == [1.0, 2.0]
+    assert again["array"].tolist() == [1.0, 2.0]
+    assert again["tags"] == ["a"]
+
+
+def test_editing_a_stage_invalidates_it(cache):
+    def double(x):
+        return x * 2
+
+    def edited(x):
+        return x * 5
+
+    # Same name and module: only the code differs
+    edited.__qualname__ = double.__qualname__
+
+    for func, expected in ((double, 6), (edited, 15)):
+        pipe = Pipeline(cache=cache)
+        pipe.stage("out", inputs=("x",))(func)
+        assert pipe.run(x=3)["out"] == expected
+        assert pipe.last_run["out"] == "computed"
+
+
+@pytest.mark.parametrize("copy_on_write", [True, False], ids=["cow", "pandas2"])
+def test_pandas_hits_do_not_share_writable_buffers(cache, monkeypatch, copy_on_write):
+    monkeypatch.setattr("src.cache._copy_on_write", lambda: copy_on_write)
+    frame = pd.DataFrame({"x": [1.0, 2.0, 3.0]})
+    cache.put("key", frame)
+
+    hit = cache.get("key")[1]
+    stored = cache._entries["key"][0]
+    # Without Copy-on-Write a shared buffer would let in-place writes through
+    assert copy_on_write or not np.shares_memory(hit["x"].to_numpy(), stored["x"].to_numpy())
+    hit.loc[0, "x"] = -1.0
+    hit["x"] *= 10
+    assert cache.get("key")[1]["x"].tolist() == [1.0, 2.0, 3.0]
+
+
+def test_figures_are_sized_by_their_payload():
+    go = pytest.importorskip("plotly.graph_objects")
+    fig = go.Figure(go.Scatter(x=np.arange(20_000), y=np.random.default_rng(0).random(20_000)))
+    cache = ResultCache(max_bytes=200_000)
+    cache.put("fig", {"chart": fig})
+    # About 320 kB of points: too large for the memory tier
+    assert cache.stats()["entries"] == 0
+    cache.put("small", {"chart": go.Figure(go.Scatter(x=[1, 2], y=[3, 4]))})
+    assert cache.stats()["entries"] == 1
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_fetch import LocalProvider, fetch_prices
+from src.fetch_scheduler import FetchScheduler
+from src.price_store import PriceStore
+
+START, END = "2021-01-04", "2021-03-01"
+
+
+@pytest.fixture
+def closes():
+    dates = pd.bdate_range("2020-12-01", "2021-03-31")
+    rng = np.random.default_rng(0)
+    values = 100 * np.exp(np.cumsum(0.01 * rng.standard_normal((len(dates), 2)), axis=0))
+    return pd.DataFrame(values, index=dates, columns=["AAA", "BBB"])
+
+
+def _fetch(store, provider):
+    scheduler = FetchScheduler(provider, max_retries=1)
+    return fetch_prices(["AAA", "BBB"], START, END, store=store, scheduler=scheduler,
+                        return_status=True)
+
+
+def test_empty_download_is_refetched(tmp_path, closes):
+    store = PriceStore(tmp_path)
+    provider = LocalProvider(closes.iloc[:0])
+
+    prices, status = _fetch(store, provider)
+    assert prices.empty
+    assert set(status["status"]) == {"empty"}
+    assert store.missing_ranges("AAA", START, END) != []
+
+    # The provider publishes the data later: the range must be requested again
+    provider.prices = closes
+    prices, status = _fetch(store, provider)
+    assert len(provider.calls) == 2
+    assert list(prices.columns) == ["AAA", "BBB"]
+    assert prices.index[0] == pd.Timestamp(START)
+    assert set(status["status"]) == {"ok"}
+
+    # Now covered: no further download
+    _fetch(store, provider)
+    assert len(provider.calls) == 2
+
+
+def test_failed_download_is_refetched(tmp_path, closes):
+    store = PriceStore(tmp_path)
+    provider = LocalProvider(closes, failing={"BBB"})
+
+    prices, status = _fetch(store, provider)
+    assert list(prices.columns) == ["AAA"]
+    assert status.loc["BBB", "status"] == "failed"
+
+    provider.failing.clear()
+    prices, _ = _fetch(store, provider)
+    assert list(prices.columns) == ["AAA", "BBB"]
+    assert provider.calls[-1][0] == ["BBB"]
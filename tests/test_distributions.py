@@ -0,0 +1,87 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import optimize, stats
+
+from src import distributions
+from src.distributions import fit_reversion_models, fit_return_distribution, fit_student_t
+
+
+def test_reversion_models_without_crossings():
+    index = pd.bdate_range("2020-01-01", periods=300)
+    prices = pd.DataFrame({
+        "trending": np.exp(np.linspace(0.0, 1.0, 300)),  # never crosses its MA
+        "cycling": 100 + np.sin(np.arange(300) / 5),
+    }, index=index)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        fit = fit_reversion_models(prices, trends=("ma_50",)).loc["ma_50"]
+
+    assert fit.loc["trending", "n_crossings"] == 0
+    assert np.isnan(fit.loc["trending", "exp_mean_days"])
+    assert fit.loc["cycling", "exp_mean_days"] == 1 / fit.loc["cycling", "exp_rate"]
+
+
+def _tight_fmin(func, x0, args=(), disp=0):
+    # scipy's default fmin tolerances leave loc off by ~1e-4 relative
+    return optimize.fmin(func, x0, args=args, xtol=1e-10, ftol=1e-12,
+                         maxiter=20000, maxfun=20000, disp=0)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+@pytest.mark.parametrize("df", [3, 5, 10])
+def test_student_t_matches_scipy(seed, df):
+    x = stats.t.rvs(df, loc=0.0005, scale=0.01, size=750, random_state=seed)
+
+    fit = fit_student_t(x)
+    reference = stats.t.fit(x, optimizer=_tight_fmin)
+
+    assert fit["converged"]
+    np.testing.assert_allclose([fit["df"], fit["loc"], fit["scale"]], reference, rtol=1e-5)
+    assert fit["loglik"] >= stats.t.logpdf(x, *stats.t.fit(x)).sum() - 1e-8
+    assert fit["loglik"] >= stats.t.logpdf(x, *reference).sum() - 1e-8
+
+
+def test_return_distribution_falls_back_to_scipy(monkeypatch):
+    series = pd.Series(stats.t.rvs(4, scale=0.01, size=500, random_state=0))
+    fit = fit_student_t(series.values)
+    monkeypatch.setattr(distributions, "fit_student_t",
+                        lambda data: {**fit, "n_iter": 2000, "converged": False})
+
+    result = fit_return_distribution(series)["student_t"]
+
+    expected = stats.t.fit(series)
+    assert [result["df"], result["loc"], result["scale"]] == [float(p) for p in expected]
+    assert result["n_iter"] == 2000
+    assert result["converged"] is False
+
+
+def test_rolling_moments_match_scipy():
+    from src.distributions import rolling_moment_diagnostics
+
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2020-01-01", periods=400)
+    returns = pd.DataFrame(0.0005 + 0.01 * rng.standard_t(4, size=(400, 3)), index=index, columns=list("abc"))
+    returns.iloc[150:153, 1] = np.nan
+    window = 63
+
+    diag = rolling_moment_diagnostics(returns, window=window)
+
+    for asset in returns.columns:
+        values = returns[asset].to_numpy()
+        for end in range(window, len(values) + 1):
+            w = values[end - window:end]
+            got = diag.xs(asset, axis=1, level="asset").iloc[end - 1]
+            if np.isnan(w).any():
+                assert got.isna().all()
+                continue
+            jb = stats.jarque_bera(w)
+            np.testing.assert_allclose(
+                got[["skew", "kurtosis", "jb_stat", "jb_p"]].to_numpy(float),
+                [stats.skew(w), stats.kurtosis(w), jb.statistic, jb.pvalue],
+                rtol=1e-8, atol=1e-12,
+            )
+    assert diag.iloc[:window - 1].isna().all().all()
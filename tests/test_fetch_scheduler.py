@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data_fetch import LocalProvider
+from src.fetch_scheduler import FetchScheduler
+
+START, END = "2021-01-04", "2021-03-01"
+RATE, BURST = 8.0, 2
+
+
+def _closes(tickers):
+    dates = pd.bdate_range("2020-12-01", "2021-03-31")
+    rng = np.random.default_rng(0)
+    values = 100 * np.exp(np.cumsum(0.01 * rng.standard_normal((len(dates), len(tickers))), axis=0))
+    return pd.DataFrame(values, index=dates, columns=tickers)
+
+
+def test_silently_throttled_tickers_recover_within_rate():
+    tickers = [f"T{i:02d}" for i in range(12)] + ["BAD"]
+    # Like yf.download: throttled or unknown tickers come back all-NaN
+    provider = LocalProvider(_closes(tickers), max_calls_per_sec=3, failing={"BAD"}, silent=True)
+    scheduler = FetchScheduler(
+        provider, batch_size=3, max_workers=4, rate=RATE, burst=BURST,
+        max_retries=6, backoff=0.1, max_backoff=0.5,
+    )
+
+    t0 = time.monotonic()
+    prices, status = scheduler.fetch(tickers, START, END)
+    elapsed = time.monotonic() - t0
+
+    assert provider.rejected > 0
+    good = status.drop("BAD")
+    assert (good["status"] == "ok").all()
+    assert (good["attempts"] > 1).any()
+    assert list(prices.columns) == sorted(tickers[:-1])
+    assert status.loc["BAD", "status"] == "empty"
+    assert status.loc["BAD", "attempts"] == 6
+
+    # Token bucket: at most BURST + RATE * t requests in any span t (half a
+    # request of slack for the gap between taking a token and calling)
+    times = np.sort(provider.call_times)
+    for i in range(len(times)):
+        span = times[i:] - times[i]
+        assert (np.arange(1, len(span) + 1) <= BURST + RATE * span + 0.5).all()
+    assert len(times) <= BURST + RATE * elapsed + 1
@@ -0,0 +1,57 @@
+import threading
+import tracemalloc
+
+import pytest
+
+from src.instrumentation import PROFILER, Profiler, profiled, stage, use_profiler
+
+
+@profiled(name="work")
+def work():
+    return sum(range(1000))
+
+
+@pytest.fixture
+def no_tracing():
+    was_tracing = tracemalloc.is_tracing()
+    if was_tracing:
+        pytest.skip("tracemalloc already running")
+    yield
+    assert not tracemalloc.is_tracing()
+
+
+def test_sessions_record_into_their_own_profiler(no_tracing):
+    sessions = [Profiler(enabled=True), Profiler(enabled=True)]
+
+    def run(profiler, n):
+        with use_profiler(profiler):
+            for _ in range(n):
+                with stage("app.step"):
+                    work()
+
+    threads = [threading.Thread(target=run, args=(p, n)) for p, n in zip(sessions, (2, 5))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert [p.report().loc["work", "calls"] for p in sessions] == [2, 5]
+    assert "work" not in PROFILER.report().index
+
+    # One session stopping must not stop tracing for the other
+    sessions[0].disable()
+    assert tracemalloc.is_tracing()
+    sessions[1].disable()
+
+
+def test_disable_leaves_external_tracing_alone():
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    try:
+        profiler = Profiler(enabled=True)
+        profiler.disable()
+        assert tracemalloc.is_tracing()
+    finally:
+        if started:
+            tracemalloc.stop()
@@ -0,0 +1,71 @@
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.precompute import PrecomputeStore
+
+START, END = "2023-01-02", "2024-01-02"
+
+
+def _prices(last):
+    index = pd.bdate_range(START, periods=250)
+    return pd.DataFrame({"AAA": np.linspace(100.0, last, 250)}, index=index)
+
+
+def _put(store, prices, tag):
+    store.put("AAA", START, END, prices, {"tag": tag}, seed=1, n_boot=10, windows=(63,))
+
+
+def test_rebuild_does_not_change_an_entry_already_looked_up(tmp_path):
+    store = PrecomputeStore(tmp_path)
+    old, new = _prices(110.0), _prices(120.0)
+    _put(store, old, "old")
+    entry = store.lookup("AAA", START, END, old, seed=1)
+
+    # The nightly job rebuilds between a session's lookup and its load
+    _put(store, new, "new")
+    assert store.load(entry) == {"tag": "old"}
+    assert store.meta(entry) is None
+    assert store.lookup("AAA", START, END, old, seed=1) is None
+
+    fresh = store.lookup("AAA", START, END, new, seed=1)
+    assert fresh != entry
+    assert store.load(fresh) == {"tag": "new"}
+    assert store.meta(fresh)["input_hash"] == store.index()[store.key("AAA", START, END)]["input_hash"]
+
+    # The superseded pickle survives pruning until the grace period ends
+    store.prune(START)
+    assert os.path.exists(tmp_path / entry)
+    os.utime(tmp_path / entry, (0, 0))
+    store.prune(START)
+    assert not os.path.exists(tmp_path / entry)
+    assert os.path.exists(tmp_path / fresh)
+
+
+def test_concurrent_loads(tmp_path):
+    store = PrecomputeStore(tmp_path)
+    entries = []
+    for i in range(12):
+        prices = _prices(100.0 + i + 1)
+        store.put(f"T{i}", START, END, prices, {"i": i}, seed=1, n_boot=10, windows=(63,))
+        entries.append(store.lookup(f"T{i}", START, END, prices, seed=1))
+
+    errors = []
+
+    def worker():
+        try:
+            for _ in range(50):
+                for i, entry in enumerate(entries):
+                    assert store.load(entry) == {"i": i}
+        except Exception as e:  # surfaced below
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert len(store._loaded) <= 8
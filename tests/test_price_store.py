@@ -0,0 +1,30 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.price_store import PriceStore
+
+
+def test_concurrent_appends_keep_every_row(tmp_path):
+    dates = pd.bdate_range("2021-01-04", periods=400)
+    closes = pd.Series(np.linspace(100.0, 200.0, len(dates)), index=dates)
+    chunks = np.array_split(np.arange(len(dates)), 16)
+    barrier = threading.Barrier(len(chunks))
+
+    def append(rows):
+        part = closes.iloc[rows]
+        barrier.wait()
+        # One store per session, as each Streamlit rerun creates its own
+        PriceStore(tmp_path).append("AAA", part, part.index[0], part.index[-1] + pd.Timedelta(days=1))
+
+    threads = [threading.Thread(target=append, args=(rows,)) for rows in chunks]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    store = PriceStore(tmp_path)
+    pd.testing.assert_series_equal(store.read("AAA"), closes.rename("AAA"), check_freq=False, check_names=False)
+    assert store.coverage("AAA") == (dates[0].date(), (dates[-1] + pd.Timedelta(days=1)).date())
+    assert not list(tmp_path.glob("*.tmp-*"))
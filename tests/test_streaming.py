@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis import compute_returns, portfolio_returns, rolling_sharpe
+from src.streaming import StreamingAnalytics
+
+
+def test_incremental_matches_batch_across_missing_closes():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2020-01-01", periods=400)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(0.01 * rng.standard_normal((400, 3)), axis=0)),
+        index=index, columns=["a", "b", "c"],
+    )
+    # Missing closes in the history tail and in the streamed bars,
+    # including two in a row
+    for row, col in [(299, "a"), (330, "b"), (360, "c"), (361, "c"), (380, "a")]:
+        prices.iloc[row, prices.columns.get_loc(col)] = np.nan
+
+    weights = pd.Series([0.5, 0.3, 0.2], index=prices.columns)
+    state = StreamingAnalytics.from_history(prices.iloc[:300], weights=weights, window=63, seed=0)
+    for date in prices.index[300:]:
+        snapshot = state.update(prices.loc[date].rename(date))
+
+    batch = portfolio_returns(compute_returns(prices), weights)
+    pd.testing.assert_series_equal(state.returns(), batch, check_freq=False, rtol=1e-12)
+    assert len(batch) == len(prices) - 1 - 5
+    assert snapshot["rolling_sharpe"] == pytest.approx(rolling_sharpe(batch, 0.0, 63).iloc[-1], rel=1e-9)
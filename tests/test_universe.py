@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analysis import compute_returns
+from src.cache import hash_inputs
+from src.universe import open_panel, publish_panel
+
+
+@pytest.fixture
+def panel(tmp_path):
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2020-01-01", periods=600)
+    prices = pd.DataFrame(
+        100 * np.exp(np.cumsum(0.01 * rng.standard_normal((600, 3)), axis=0)),
+        index=index, columns=["AAA", "BBB", "BTC-USD"],
+    )
+    # Stocks do not trade on weekends, crypto does
+    prices.loc[index.dayofweek >= 5, ["AAA", "BBB"]] = np.nan
+    publish_panel(prices, index[0], index[-1] + pd.Timedelta(days=1), root=tmp_path)
+    return open_panel(tmp_path)
+
+
+@pytest.mark.parametrize("tickers", [["AAA", "BBB"], ["AAA", "BTC-USD"]])
+def test_panel_returns_match_compute_returns(panel, tickers):
+    start, end = "2020-03-01", "2021-06-01"
+    pd.testing.assert_frame_equal(
+        panel.returns(tickers, start, end),
+        compute_returns(panel.prices(tickers, start, end)),
+        check_freq=False,
+    )
+
+
+def test_panel_cache_key_names_the_version(panel, tmp_path):
+    assert hash_inputs(panel) == hash_inputs(open_panel(tmp_path))
+    assert panel.version in repr(panel)
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.visualization import (
+    MAX_FIGURE_BYTES,
+    animated_ci_band,
+    figure_payload_bytes,
+    rolling_diagnostics_chart,
+    rolling_sharpe_chart,
+)
+
+
+@pytest.fixture(scope="module")
+def series():
+    # Intraday-length history: far more points than any budget
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2000-01-01", periods=50_000, freq="h")
+    return pd.Series(np.cumsum(rng.standard_normal(len(index))), index=index)
+
+
+@pytest.mark.parametrize("max_points", [None, 20_000])
+def test_line_charts_respect_payload_cap(series, max_points):
+    ci = pd.DataFrame({"lower": series - 1, "mean": series, "upper": series + 1})
+    diag = pd.DataFrame({"skew": series, "kurtosis": series, "jb_p": series.abs() + 1e-3})
+
+    figures = [
+        animated_ci_band(ci, max_points=max_points),
+        rolling_sharpe_chart(series, max_points=max_points),
+        rolling_diagnostics_chart(diag),
+    ]
+    for fig in figures:
+        assert figure_payload_bytes(fig) <= MAX_FIGURE_BYTES
+        assert all(len(trace.x) >= 100 for trace in fig.data)